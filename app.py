@@ -197,18 +197,15 @@ def show_interface_toggle():
     st.sidebar.markdown("---")
     st.sidebar.subheader("🔄 Interface Mode")
     
-    # Toggle between interfaces
-    use_conversational = st.sidebar.toggle(
+    # Toggle between interfaces (state is updated in the callback, before the rerun)
+    st.sidebar.toggle(
         "Conversational AI Mode",
         value=st.session_state.use_conversational_interface,
-        help="Toggle between traditional search and conversational AI interface"
+        help="Toggle between traditional search and conversational AI interface",
+        key="interface_toggle",
+        on_change=sync_interface_mode
     )
     
-    # Update session state if changed
-    if use_conversational != st.session_state.use_conversational_interface:
-        st.session_state.use_conversational_interface = use_conversational
-        st.rerun()
-    
     # Show current mode
     if st.session_state.use_conversational_interface:
         st.sidebar.success("🤖 AI Chat Mode Active")
@@ -218,6 +215,16 @@ def show_interface_toggle():
         st.sidebar.caption("Direct search through Islamic texts")
 
 
+def sync_interface_mode():
+    """Copy the interface toggle into the interface preference"""
+    st.session_state.use_conversational_interface = st.session_state.interface_toggle
+
+
+def set_show_admin(show: bool):
+    """Switch between the admin dashboard and the search interface"""
+    st.session_state.show_admin = show
+
+
 def show_search_interface():
     """Show the appropriate search interface based on user preference"""
     
@@ -286,9 +293,7 @@ def main_content_area():
         show_admin_dashboard()
         
         # Button to return to search
-        if st.button("🔍 Back to Search"):
-            st.session_state.show_admin = False
-            st.rerun()
+        st.button("🔍 Back to Search", on_click=set_show_admin, args=(False,))
     else:
         # Show the appropriate search interface
         show_search_interface()
@@ -297,9 +302,7 @@ def main_content_area():
         from components.auth_ui import is_current_user_admin
         if is_current_user_admin():
             st.markdown("---")
-            if st.button("🛠️ Admin Dashboard"):
-                st.session_state.show_admin = True
-                st.rerun()
+            st.button("🛠️ Admin Dashboard", on_click=set_show_admin, args=(True,))
 
 
 # --- SECTION 8: MAIN APPLICATION ENTRY POINT ---
@@ -77,8 +77,8 @@ def show_user_management():
     st.subheader("👥 User Management")
     
     # Load users for management
-    from core.auth import load_users
-    users = load_users()
+    from core.auth import list_users
+    users = list_users()
     
     if not users:
         st.info("No users found.")
@@ -5,7 +5,7 @@ Handles login and registration forms with proper Streamlit session state managem
 """
 
 import streamlit as st
-from core.auth import authenticate_user, register_user
+from core.auth import authenticate_user, register_user, normalize_email
 
 
 def show_login() -> bool:
@@ -32,7 +32,7 @@ def show_login() -> bool:
                     st.error("Please enter both email and password.")
                 elif authenticate_user(email, password):
                     st.session_state.authenticated = True
-                    st.session_state.email = email
+                    st.session_state.email = normalize_email(email)
                     # Import here to avoid circular imports
                     from core.auth import is_admin
                     st.session_state.is_admin = is_admin(email)
@@ -22,6 +22,7 @@ except ImportError as e:
     CONVERSATIONAL_SERVICE_AVAILABLE = False
 
 # Core system imports
+from components.styling import minify_css
 from core.query_blocking import is_blocked_query, log_blocked_query
 from utils.logging import log_query_for_user
 
@@ -36,10 +37,8 @@ except ImportError:
 
 
 # --- SECTION 2: CSS & STYLING UTILITIES ---
-def force_conversational_css():
-    """Force CSS application for conversational interface components"""
-    
-    conversational_css = """
+# Minified once at import; force_conversational_css re-emits it each run
+_CONVERSATIONAL_CSS = minify_css("""
     <style>
     /* CONVERSATIONAL INTERFACE SPECIFIC CSS */
     
@@ -231,9 +230,12 @@ def force_conversational_css():
         }
     }
     </style>
-    """
-    
-    st.markdown(conversational_css, unsafe_allow_html=True)
+    """)
+
+
+def force_conversational_css():
+    """Force CSS application for conversational interface components"""
+    st.markdown(_CONVERSATIONAL_CSS, unsafe_allow_html=True)
 
 
 def test_html_rendering() -> bool:
@@ -393,18 +395,15 @@ class ConversationalChatInterface:
     def render_advanced_welcome(self):
         """Render welcome message using native Streamlit components"""
         
-        # Try to load the actual HalalBot logo
+        # Try to load the actual HalalBot logo (statically served URL)
         try:
-            import base64
-            import os
+            from components.styling import load_static_assets
             
-            logo_path = "static/halalbot_logo.png"
-            if os.path.exists(logo_path):
-                with open(logo_path, "rb") as f:
-                    logo_data = base64.b64encode(f.read()).decode()
+            logo_url = load_static_assets()['logo']
+            if logo_url:
                 st.markdown(f"""
                 <div style="text-align: center; margin-bottom: 1rem;">
-                    <img src="data:image/png;base64,{logo_data}" alt="HalalBot Logo" style="height: 80px; width: auto; border-radius: 10px;">
+                    <img src="{logo_url}" alt="HalalBot Logo" style="height: 80px; width: auto; border-radius: 10px;">
                 </div>
                 """, unsafe_allow_html=True)
             else:
@@ -432,16 +431,13 @@ class ConversationalChatInterface:
         """Get logo element with fallback"""
         
         try:
-            import base64
-            import os
+            from components.styling import load_static_assets
             
-            logo_path = "static/halalbot_logo.png"
-            if os.path.exists(logo_path):
-                with open(logo_path, "rb") as f:
-                    logo_data = base64.b64encode(f.read()).decode()
+            logo_url = load_static_assets()['logo']
+            if logo_url:
                 return f'''
                 <div style="text-align: center; margin-bottom: 1.5rem;">
-                    <img src="data:image/png;base64,{logo_data}" alt="HalalBot Logo" 
+                    <img src="{logo_url}" alt="HalalBot Logo" 
                          style="height: 80px; width: auto; border-radius: 15px; 
                                 box-shadow: 0 4px 15px rgba(0,0,0,0.2);">
                 </div>
@@ -861,6 +857,12 @@ class ConversationalChatInterface:
         except Exception as e:
             print(f"Quick topics error: {e}")
 
+    def reset_conversation(self):
+        """Clear the chat history (runs as a button callback, before the rerun)"""
+        st.session_state.chat_history = []
+        st.session_state.conversation_started = False
+        st.session_state.pending_follow_ups = []
+
     def display_conversation_controls(self):
         """Display conversation management controls with error handling"""
         
@@ -872,11 +874,7 @@ class ConversationalChatInterface:
             col1, col2, col3 = st.columns(3)
             
             with col1:
-                if st.button("🔄 New Conversation"):
-                    st.session_state.chat_history = []
-                    st.session_state.conversation_started = False
-                    st.session_state.pending_follow_ups = []
-                    st.rerun()
+                st.button("🔄 New Conversation", on_click=self.reset_conversation)
             
             with col2:
                 if st.button("📥 Export Chat"):
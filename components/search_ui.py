@@ -4,92 +4,227 @@ Enhanced search interface for HalalBot with modern, beautiful UI
 """
 
 import streamlit as st
+import threading
+from types import MappingProxyType
 from components.styling import (
-    create_app_header, create_disclaimer_section, create_search_container,
-    create_styled_result_card, create_query_header, create_no_results_message,
-    create_search_tips
+    render_intro, render_results, create_query_header,
+    create_no_results_message, create_search_tips
 )
-from services.search_service import search_faiss
+from services.search_service import get_search_service, search_faiss, document_index_generation
 from core.feedback_utils import log_feedback
 from core.query_blocking import is_blocked_query, log_blocked_query
 from utils.hashing import hash_text
-from utils.logging import log_query_for_user
+from utils.logging import log_in_background, log_query_for_user
 
 
-def create_search_interface():
-    """Create the main search interface with enhanced styling"""
+# Source filter choices mapped to search_faiss source_filter values
+_FILTER_MAP = MappingProxyType({
+    "All Sources": None,
+    "Quran only": "quran-only",
+    "Hadith only": "hadith-only",
+    "Fatwa only": "fatwa-only",
+    "Zakat only": "zakat-only",
+    "Other only": "other-only"
+})
+
+_SUGGESTIONS = (
+    "**Lower the minimum score** to see more results",
+    "**Use simpler terms**: 'prayer' instead of 'salah timing'",
+    "**Try Arabic terms**: 'wudu', 'zakat', 'hajj'",
+    "**Ask complete questions**: 'How to perform ablution?'",
+    "**Check spelling** of your search terms"
+)
+
+_EXAMPLES = (
+    "How to perform wudu?",
+    "What is the ruling on music in Islam?",
+    "Zakat calculation",
+    "Prayer times requirements",
+    "Halal food guidelines",
+    "Marriage in Islam",
+    "Business ethics in Islam"
+)
+
+_QUICK_SEARCHES = MappingProxyType({
+    "🕌 Prayer": "prayer requirements",
+    "💰 Zakat": "zakat calculation",
+    "🕋 Hajj": "hajj pilgrimage",
+    "🍽️ Halal": "halal food",
+    "💒 Marriage": "marriage islam",
+    "📚 Quran": "quran verses"
+})
+
+# Control defaults; popular queries are precomputed for these settings
+_DEFAULT_TOP_K = 5
+_DEFAULT_MIN_SCORE = 0.05
+
+
+# Popular/quick query results at default controls, filled in the background
+# and tagged with the document index generation they were computed against
+_precomputed: dict = {}
+_precomputed_generation = None
+_precompute_lock = threading.Lock()
+_precompute_started = False
+_precompute_running = False  # a warm-up thread is in flight
+_precompute_stale = False    # reset while it ran: its batch must be redone
+
+
+def _precompute_examples():
+    """Search every popular/quick query with default controls (background thread)"""
+    global _precompute_started, _precompute_running, _precompute_stale, _precomputed_generation
     
-    # App header with logo and branding
-    st.markdown(create_app_header(), unsafe_allow_html=True)
+    queries = list(dict.fromkeys(_EXAMPLES + tuple(_QUICK_SEARCHES.values())))
+    while True:
+        try:
+            # Read the generation first so a reload mid-batch marks results stale
+            generation = document_index_generation()
+            results = get_search_service().search_batch(
+                queries, top_k=_DEFAULT_TOP_K, min_score=_DEFAULT_MIN_SCORE
+            )
+        except Exception as e:
+            print(f"⚠️  Could not precompute popular searches: {e}")
+            results, generation = [], None
+        
+        # Keep only real results; a failed batch comes back as empty lists
+        found = {query: hits for query, hits in zip(queries, results) if hits}
+        
+        with _precompute_lock:
+            # Reset mid-batch: these results predate it, so search again
+            if _precompute_stale:
+                _precompute_stale = False
+                continue
+            
+            _precomputed.clear()
+            _precomputed.update(found)
+            _precomputed_generation = generation
+            _precompute_running = False
+            
+            # Nothing usable: allow a later page view to try again
+            if not found:
+                _precompute_started = False
+            return
+
+
+def start_precompute():
+    """Warm the popular-query cache once per process without blocking the page"""
+    global _precompute_started, _precompute_running
     
-    # Disclaimer section
-    st.markdown(create_disclaimer_section(), unsafe_allow_html=True)
+    with _precompute_lock:
+        if _precompute_started:
+            return
+        _precompute_started = True
+        _precompute_running = True
     
-    # Search container
-    st.markdown(create_search_container(), unsafe_allow_html=True)
+    threading.Thread(
+        target=_precompute_examples, name="halalbot-precompute", daemon=True
+    ).start()
+
+
+def _reset_precompute():
+    """Drop precomputed results and start warming them again"""
+    global _precompute_started, _precompute_stale
     
-    # Search input with custom styling
-    st.markdown('<label class="search-label">Ask a question:</label>', unsafe_allow_html=True)
-    query = st.text_input(
-        "Ask a question:",
-        placeholder="e.g., How to perform wudu? What is zakat? Prayer times...",
-        label_visibility="collapsed",
-        key="main_search"
-    )
-    # Add this right after the text input
-    search_button = st.button("🔍 Search", type="primary")
+    with _precompute_lock:
+        _precomputed.clear()
+        
+        # Only one warm-up at a time: a running one redoes its batch instead
+        if _precompute_running:
+            _precompute_stale = True
+            return
+        _precompute_started = False
+    start_precompute()
+
+
+def run_search(query: str, top_k: int, min_score: float, source_filter) -> list:
+    """Search, reusing precomputed results for popular queries at default settings"""
+    if top_k == _DEFAULT_TOP_K and min_score == _DEFAULT_MIN_SCORE and source_filter is None:
+        cached = _precomputed.get(query)
+        if cached:
+            if _precomputed_generation == document_index_generation():
+                return cached
+            
+            # Documents changed since the warm-up: search live and re-warm
+            _reset_precompute()
     
-    # Controls section in a grid layout
-    st.markdown('<div class="controls-container">', unsafe_allow_html=True)
+    return search_faiss(query, top_k=top_k, min_score=min_score, source_filter=source_filter)
+
+
+def create_search_interface():
+    """Create the main search interface with enhanced styling"""
     
-    col1, col2 = st.columns(2)
+    # App header, disclaimer and search container in a single element
+    render_intro()
     
-    with col1:
-        st.markdown('<div class="control-group">', unsafe_allow_html=True)
-        st.markdown('<div class="control-label">Number of Responses</div>', unsafe_allow_html=True)
-        top_k = st.slider(
-            "Number of responses",
-            min_value=1,
-            max_value=10,
-            value=5,
-            label_visibility="collapsed"
-        )
-        st.markdown('</div>', unsafe_allow_html=True)
+    search_panel()
+
+
+@st.fragment
+def search_panel():
+    """
+    Search form, tips and results
     
-    with col2:
-        st.markdown('<div class="control-group">', unsafe_allow_html=True)
-        st.markdown('<div class="control-label">Minimum Score</div>', unsafe_allow_html=True)
-        min_score = st.slider(
-            "Minimum score",
-            min_value=0.0,
-            max_value=1.0,
-            value=0.05,
-            step=0.01,
+    Runs as a fragment so submitting a search or using the example picker
+    only reruns this panel, not the page CSS, header and disclaimer.
+    """
+    
+    # Query and controls are submitted together, so adjusting a slider
+    # or filter does not rerun the page until Search is pressed
+    with st.form("search_form", border=False):
+        # Search input with custom styling
+        st.markdown('<label class="search-label">Ask a question:</label>', unsafe_allow_html=True)
+        query = st.text_input(
+            "Ask a question:",
+            placeholder="e.g., How to perform wudu? What is zakat? Prayer times...",
+            label_visibility="collapsed",
+            key="main_search"
+        )
+        # Add this right after the text input
+        search_button = st.form_submit_button("🔍 Search", type="primary")
+        
+        # Controls section in a grid layout
+        st.markdown('<div class="controls-container">', unsafe_allow_html=True)
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown('<div class="control-group">', unsafe_allow_html=True)
+            st.markdown('<div class="control-label">Number of Responses</div>', unsafe_allow_html=True)
+            top_k = st.slider(
+                "Number of responses",
+                min_value=1,
+                max_value=10,
+                value=_DEFAULT_TOP_K,
+                label_visibility="collapsed"
+            )
+            st.markdown('</div>', unsafe_allow_html=True)
+        
+        with col2:
+            st.markdown('<div class="control-group">', unsafe_allow_html=True)
+            st.markdown('<div class="control-label">Minimum Score</div>', unsafe_allow_html=True)
+            min_score = st.slider(
+                "Minimum score",
+                min_value=0.0,
+                max_value=1.0,
+                value=_DEFAULT_MIN_SCORE,
+                step=0.01,
+                label_visibility="collapsed"
+            )
+            st.markdown('</div>', unsafe_allow_html=True)
+        
+        st.markdown('</div>', unsafe_allow_html=True)  # Close controls-container
+        
+        # Source filter
+        st.markdown('<div class="control-label">Source Filter</div>', unsafe_allow_html=True)
+        filter_choice = st.selectbox(
+            "Source filter",
+            options=tuple(_FILTER_MAP),
             label_visibility="collapsed"
         )
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    st.markdown('</div>', unsafe_allow_html=True)  # Close controls-container
-    
-    # Source filter
-    st.markdown('<div class="control-label">Source Filter</div>', unsafe_allow_html=True)
-    filter_choice = st.selectbox(
-        "Source filter",
-        options=[
-            "All Sources",
-            "Quran only",
-            "Hadith only",
-            "Fatwa only",
-            "Zakat only",
-            "Other only"
-        ],
-        label_visibility="collapsed"
-    )
     
     # Search tips in an expander
     st.markdown('<div class="tips-section">', unsafe_allow_html=True)
     with st.expander("💡 Search Tips & Popular Topics"):
-        st.markdown(create_search_tips(), unsafe_allow_html=True)
+        st.html(create_search_tips())
     st.markdown('</div>', unsafe_allow_html=True)
     
     st.markdown('</div>', unsafe_allow_html=True)  # Close search-container
@@ -97,6 +232,9 @@ def create_search_interface():
     # Process search query
     if query and search_button:
         process_search_query(query, top_k, min_score, filter_choice)
+    
+    # Warm popular-query results in the background (no-op once started)
+    start_precompute()
 
 
 def process_search_query(query: str, top_k: int, min_score: float, filter_choice: str):
@@ -105,41 +243,26 @@ def process_search_query(query: str, top_k: int, min_score: float, filter_choice
     # Check for blocked queries
     if is_blocked_query(query):
         st.error("⛔ This question is inappropriate and will not be processed. Please respect the sacred nature of this service.")
-        log_blocked_query(st.session_state.email, query)
+        log_in_background(log_blocked_query, st.session_state.email, query)
         return
     
-    # Map filter choices
-    filter_map = {
-        "Quran only": "quran-only",
-        "Hadith only": "hadith-only",
-        "Fatwa only": "fatwa-only",
-        "Zakat only": "zakat-only",
-        "Other only": "other-only",
-        "All Sources": None
-    }
-    
     # Display query header
-    st.markdown(create_query_header(query), unsafe_allow_html=True)
+    st.html(create_query_header(query))
     
     # Perform search
     try:
         with st.spinner("🔍 Searching through Islamic sources..."):
-            results = search_faiss(
-                query,
-                top_k=top_k,
-                min_score=min_score,
-                source_filter=filter_map[filter_choice]
-            )
+            results = run_search(query, top_k, min_score, _FILTER_MAP[filter_choice])
         
         if results:
             # Log successful query
-            log_query_for_user(st.session_state.email, query, results)
+            log_in_background(log_query_for_user, st.session_state.email, query, results)
             
             # Display results
             display_search_results(query, results)
         else:
             # No results found
-            st.markdown(create_no_results_message(), unsafe_allow_html=True)
+            st.html(create_no_results_message())
             
             # Suggestions for better results
             show_search_suggestions()
@@ -152,23 +275,25 @@ def process_search_query(query: str, top_k: int, min_score: float, filter_choice
 def display_search_results(query: str, results: list):
     """Display search results with enhanced styling"""
     
-    st.markdown('<div class="results-container">', unsafe_allow_html=True)
-    
     # Results summary
     st.success(f"✅ Found {len(results)} relevant result(s)")
-    
+
+    # Display all result cards as a single element
+    render_results(results)
+
+    # Feedback section for each result (stateful widgets, rendered separately)
     for i, result in enumerate(results, 1):
-        # Display result card
-        st.markdown(create_styled_result_card(result, i), unsafe_allow_html=True)
-        
-        # Feedback section for each result
         create_feedback_section(query, result, i)
-    
-    st.markdown('</div>', unsafe_allow_html=True)
 
 
+@st.fragment
 def create_feedback_section(query: str, result: dict, index: int):
-    """Create feedback section for each result"""
+    """
+    Create feedback section for each result
+
+    Runs as a fragment so a 👍/👎 click only reruns this section instead
+    of the whole search page (and the search itself).
+    """
     
     result_id = hash_text(result["text"])
     
@@ -179,12 +304,12 @@ def create_feedback_section(query: str, result: dict, index: int):
         
         with col1:
             if st.button("👍 Yes", key=f"yes_{index}_{result_id}"):
-                log_feedback(query, result["text"], "up", st.session_state.email)
+                log_in_background(log_feedback, query, result["text"], "up", st.session_state.email)
                 st.success("Thank you for your feedback!")
                 
         with col2:
             if st.button("👎 No", key=f"no_{index}_{result_id}"):
-                log_feedback(query, result["text"], "down", st.session_state.email)
+                log_in_background(log_feedback, query, result["text"], "down", st.session_state.email)
                 st.warning("We'll use your feedback to improve.")
         
         with col3:
@@ -198,59 +323,50 @@ def show_search_suggestions():
     
     st.markdown("### 💡 Try these suggestions:")
     
-    suggestions = [
-        "**Lower the minimum score** to see more results",
-        "**Use simpler terms**: 'prayer' instead of 'salah timing'",
-        "**Try Arabic terms**: 'wudu', 'zakat', 'hajj'",
-        "**Ask complete questions**: 'How to perform ablution?'",
-        "**Check spelling** of your search terms"
-    ]
-    
-    for suggestion in suggestions:
+    for suggestion in _SUGGESTIONS:
         st.markdown(f"• {suggestion}")
     
     # Popular search examples
     with st.expander("🔥 Popular Search Examples"):
-        examples = [
-            "How to perform wudu?",
-            "What is the ruling on music in Islam?",
-            "Zakat calculation",
-            "Prayer times requirements",
-            "Halal food guidelines",
-            "Marriage in Islam",
-            "Business ethics in Islam"
-        ]
-        
-        st.markdown("**Click any example to search:**")
-        
-        cols = st.columns(2)
-        for i, example in enumerate(examples):
-            with cols[i % 2]:
-                if st.button(f"🔍 {example}", key=f"example_{i}"):
-                    st.session_state.main_search = example
-                    st.rerun()
+        st.selectbox(
+            "Pick any example to search:",
+            options=_EXAMPLES,
+            index=None,
+            placeholder="🔍 Choose an example...",
+            key="example_pick",
+            on_change=_apply_search_pick,
+            args=("example_pick",)
+        )
 
 
 def create_quick_search_buttons():
-    """Create quick search buttons for common topics"""
+    """Create quick search picker for common topics"""
     
     st.markdown("### 🚀 Quick Search")
     
-    quick_searches = {
-        "🕌 Prayer": "prayer requirements",
-        "💰 Zakat": "zakat calculation",
-        "🕋 Hajj": "hajj pilgrimage",
-        "🍽️ Halal": "halal food",
-        "💒 Marriage": "marriage islam",
-        "📚 Quran": "quran verses"
-    }
+    st.selectbox(
+        "Quick search",
+        options=tuple(_QUICK_SEARCHES),
+        index=None,
+        placeholder="Choose a topic...",
+        label_visibility="collapsed",
+        key="quick_pick",
+        on_change=_apply_search_pick,
+        args=("quick_pick", _QUICK_SEARCHES)
+    )
+
+
+def _apply_search_pick(widget_key: str, queries=None):
+    """
+    Copy a picked example into the search box and reset the picker
     
-    cols = st.columns(3)
-    for i, (label, query) in enumerate(quick_searches.items()):
-        with cols[i % 3]:
-            if st.button(label, key=f"quick_{i}"):
-                st.session_state.main_search = query
-                st.rerun()
+    Runs as an on_change callback, before the search box is rendered,
+    so the new query shows up in the same rerun.
+    """
+    pick = st.session_state[widget_key]
+    if pick is not None:
+        st.session_state.main_search = queries[pick] if queries else pick
+    st.session_state[widget_key] = None
 
 
 # Helper function for search metrics
@@ -6,77 +6,83 @@ FIXED VERSION: Resolves HTML rendering and CSS timing issues
 """
 
 import streamlit as st
-import base64
+import logging
 import os
+import re
+from functools import lru_cache
+from html import escape
 from pathlib import Path
+from string import Template
+from types import MappingProxyType
 
+logger = logging.getLogger(__name__)
 
-def get_base64_image(image_path: str) -> str:
-    """
-    Convert image to base64 string for embedding in CSS
-    
-    Args:
-        image_path: Path to image file
-        
-    Returns:
-        Base64 encoded string of the image
-    """
+# Google Fonts are linked from the page rather than @import-ed from the
+# stylesheet, so the font CSS is fetched in parallel with our own styles.
+# Only the weights the stylesheets use are requested.
+_GOOGLE_FONTS_URL = (
+    "https://fonts.googleapis.com/css2"
+    "?family=Inter:wght@400;500;600;700&family=Amiri:wght@700&display=swap"
+)
+_FONT_LINKS = (
+    '<link rel="preconnect" href="https://fonts.googleapis.com">'
+    '<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>'
+    f'<link rel="stylesheet" href="{_GOOGLE_FONTS_URL}">'
+)
+
+# Static assets live next to the app, independent of the working directory
+_STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+
+# URL prefix Streamlit serves _STATIC_DIR under (server.enableStaticServing)
+_STATIC_URL = "app/static"
+
+# One-shot minifier for the stylesheet: drop comments, collapse whitespace,
+# trim it around punctuation and !important, and drop the last semicolon
+# in each block
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE_RE = re.compile(r"\s+")
+_CSS_PUNCT_RE = re.compile(r"\s*([{};:,>])\s*")
+
+
+def minify_css(css: str) -> str:
+    """Strip comments and redundant whitespace from a CSS/<style> string"""
+    css = _CSS_COMMENT_RE.sub("", css)
+    css = _CSS_SPACE_RE.sub(" ", css)
+    css = _CSS_PUNCT_RE.sub(r"\1", css).strip()
+    return css.replace(";}", "}").replace(" !important", "!important")
+
+
+@lru_cache(maxsize=1)
+def _static_files() -> frozenset:
+    """Names of the files in the static directory, scanned once per process"""
     try:
-        # Try multiple possible paths
-        possible_paths = [
-            image_path,
-            f"static/{image_path}",
-            f"./{image_path}",
-            f"./static/{image_path}"
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                with open(path, "rb") as img_file:
-                    return base64.b64encode(img_file.read()).decode()
-        
-        # If file not found, return empty string
-        print(f"Warning: Image not found at any of these paths: {possible_paths}")
-        return ""
-        
-    except Exception as e:
-        print(f"Error loading image {image_path}: {e}")
-        return ""
+        with os.scandir(_STATIC_DIR) as entries:
+            return frozenset(entry.name for entry in entries if entry.is_file())
+    except FileNotFoundError:
+        return frozenset()
 
 
-def apply_custom_css():
-    """
-    Apply comprehensive modern CSS styling for HalalBot
-    FIXED: Ensures HTML rendering works properly
-    """
-    
-    # Get logo as base64 for embedding
-    logo_base64 = get_base64_image("halalbot_logo.png")
-    logo_data_url = f"data:image/png;base64,{logo_base64}" if logo_base64 else ""
-    
-    # CRITICAL FIX: Use st.html instead of st.markdown for CSS
-    # This ensures better CSS injection and HTML compatibility
-    css_content = f"""
+# Main stylesheet. A string.Template rather than an f-string, so CSS braces
+# stay literal; $logo_background is the only substitution.
+_CSS_TEMPLATE = Template("""
     <style>
-    /* Import Google Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=Amiri:wght@400;700&display=swap');
-    
     /* CRITICAL: Force HTML rendering for Streamlit */
-    .stMarkdown {{
+    .stMarkdown {
         color: inherit !important;
-    }}
+    }
     
-    .stMarkdown > div {{
+    .stMarkdown > div {
         color: inherit !important;
-    }}
+    }
     
     /* Ensure unsafe_allow_html works */
-    [data-testid="stMarkdownContainer"] {{
+    [data-testid="stMarkdownContainer"] {
         color: inherit !important;
-    }}
+    }
     
-    /* Root Variables - Enhanced Islamic Color Palette */
-    :root {{
+    /* Root Variables - Enhanced Islamic Color Palette
+       (shadows and gradients are written out literally where used) */
+    :root {
         --primary-green: #1B5E3F;
         --primary-green-light: #2E7D4A;
         --secondary-green: #4A9B6B;
@@ -95,89 +101,95 @@ def apply_custom_css():
         --error-red: #E53E3E;
         --warning-orange: #DD6B20;
         --info-blue: #3182CE;
-        
-        /* Shadows */
-        --shadow-xs: 0 1px 2px 0 rgba(0, 0, 0, 0.05);
-        --shadow-sm: 0 1px 3px 0 rgba(0, 0, 0, 0.1), 0 1px 2px 0 rgba(0, 0, 0, 0.06);
-        --shadow-md: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-        --shadow-lg: 0 10px 15px -3px rgba(0, 0, 0, 0.1), 0 4px 6px -2px rgba(0, 0, 0, 0.05);
-        --shadow-xl: 0 20px 25px -5px rgba(0, 0, 0, 0.1), 0 10px 10px -5px rgba(0, 0, 0, 0.04);
-        
-        /* Gradients */
-        --gradient-primary: linear-gradient(135deg, var(--primary-green) 0%, var(--secondary-green) 100%);
-        --gradient-gold: linear-gradient(135deg, var(--accent-gold) 0%, var(--accent-gold-light) 100%);
-        --gradient-subtle: linear-gradient(135deg, var(--warm-white) 0%, var(--off-white) 100%);
-    }}
+    }
     
     /* CRITICAL FIX: Global Styles with Higher Specificity */
-    .stApp {{
+    .stApp {
         background: var(--warm-white) !important;
         font-family: 'Inter', sans-serif !important;
         color: var(--text-dark) !important;
         line-height: 1.6 !important;
-    }}
+    }
+    
+    /* Shared surfaces: corner radius and shadow declared once for every
+       element that uses them (:where keeps specificity at zero; the
+       tab list keeps its own specificity to beat Streamlit's styles) */
+    :where(.stTextInput > div > div > input,
+           .stSelectbox > div > div > div,
+           .stTextArea > div > div > textarea,
+           .stButton > button,
+           [data-testid="stExpander"] summary,
+           .stAlert) {
+        border-radius: 12px !important;
+    }
+    
+    .stTabs [data-baseweb="tab-list"],
+    .control-group {
+        border-radius: 12px;
+    }
     
-    /* CRITICAL FIX: Force HTML content to inherit proper styles */
-    .stApp * {{
-        color: inherit;
-    }}
+    :where(.stSlider > div > div > div > div, .stButton > button, .stAlert) {
+        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06) !important;
+    }
+    
+    :where(.logo-container, .logo-placeholder, .disclaimer-container, .result-card) {
+        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
+    }
     
     /* Hide Streamlit Branding */
-    #MainMenu {{visibility: hidden;}}
-    footer {{visibility: hidden;}}
-    header {{visibility: hidden;}}
-    .stDeployButton {{visibility: hidden;}}
+    #MainMenu {visibility: hidden;}
+    footer {visibility: hidden;}
+    header {visibility: hidden;}
+    .stDeployButton {visibility: hidden;}
     
     /* CRITICAL FIX: Enhanced Form Field Styling with Better Inheritance */
     .stTextInput > div > div > input,
     .stSelectbox > div > div > div,
-    .stTextArea > div > div > textarea {{
+    .stTextArea > div > div > textarea {
         background-color: white !important;
         color: var(--text-dark) !important;
         border: 2px solid var(--border-medium) !important;
-        border-radius: 12px !important;
         padding: 1rem 1.25rem !important;
         font-size: 1rem !important;
         font-weight: 500 !important;
-        transition: all 0.3s ease !important;
-        box-shadow: var(--shadow-sm) !important;
+        transition: border-color 0.3s ease, box-shadow 0.3s ease !important;
+        box-shadow: 0 1px 3px 0 rgba(0, 0, 0, 0.1), 0 1px 2px 0 rgba(0, 0, 0, 0.06) !important;
         font-family: 'Inter', sans-serif !important;
-    }}
+    }
     
-    /* Focus states for form fields */
+    /* Focus states for form fields (background and text colour carry
+       over from the base rule, which matches the same elements) */
     .stTextInput > div > div > input:focus,
     .stSelectbox > div > div > div:focus-within,
-    .stTextArea > div > div > textarea:focus {{
+    .stTextArea > div > div > textarea:focus {
         border-color: var(--primary-green) !important;
-        box-shadow: 0 0 0 3px rgba(27, 94, 63, 0.1), var(--shadow-md) !important;
-        background-color: white !important;
-        color: var(--text-dark) !important;
+        box-shadow: 0 0 0 3px rgba(27, 94, 63, 0.1), 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06) !important;
         outline: none !important;
-    }}
+    }
     
     /* Placeholder text styling */
     .stTextInput > div > div > input::placeholder,
-    .stTextArea > div > div > textarea::placeholder {{
+    .stTextArea > div > div > textarea::placeholder {
         color: var(--text-light) !important;
         opacity: 0.8 !important;
-    }}
+    }
     
     /* Form Labels */
     .stTextInput > label,
     .stSelectbox > label,
     .stTextArea > label,
-    .stSlider > label {{
+    .stSlider > label {
         color: var(--text-dark) !important;
         font-weight: 600 !important;
         font-size: 1.1rem !important;
         margin-bottom: 0.5rem !important;
         font-family: 'Inter', sans-serif !important;
-    }}
+    }
     
     /* CONVERSATIONAL INTERFACE SPECIFIC FIXES */
     
     /* Welcome Container - Fixed HTML Rendering */
-    .welcome-container {{
+    .welcome-container {
         background: linear-gradient(135deg, #1B5E3F 0%, #2E7D4A 100%) !important;
         color: white !important;
         padding: 2rem !important;
@@ -187,39 +199,39 @@ def apply_custom_css():
         box-shadow: 0 8px 25px rgba(0,0,0,0.15) !important;
         position: relative !important;
         overflow: hidden !important;
-    }}
+    }
     
-    .welcome-container * {{
+    .welcome-container * {
         color: white !important;
-    }}
+    }
     
-    .welcome-container h2 {{
+    .welcome-container h2 {
         margin: 0 !important;
         font-family: 'Amiri', serif !important;
         font-size: 2.5rem !important;
         color: white !important;
-    }}
+    }
     
-    .welcome-container p {{
+    .welcome-container p {
         margin: 1rem 0 !important;
         font-size: 1.1rem !important;
         color: white !important;
         line-height: 1.7 !important;
-    }}
+    }
     
-    .welcome-container em {{
+    .welcome-container em {
         color: white !important;
         font-style: italic !important;
-    }}
+    }
     
     /* Chat Messages - Fixed HTML Rendering */
-    .user-message {{
+    .user-message {
         display: flex !important;
         justify-content: flex-end !important;
         margin: 1rem 0 !important;
-    }}
+    }
     
-    .user-message-content {{
+    .user-message-content {
         background: linear-gradient(135deg, #E8F5E8 0%, #D4EDDA 100%) !important;
         color: #1B5E3F !important;
         padding: 1rem 1.5rem !important;
@@ -228,15 +240,15 @@ def apply_custom_css():
         font-weight: 500 !important;
         box-shadow: 0 4px 12px rgba(0,0,0,0.1) !important;
         border: 1px solid rgba(27, 94, 63, 0.2) !important;
-    }}
+    }
     
-    .ai-message {{
+    .ai-message {
         display: flex !important;
         justify-content: flex-start !important;
         margin: 1rem 0 !important;
-    }}
+    }
     
-    .ai-message-content {{
+    .ai-message-content {
         background: white !important;
         color: #2D3748 !important;
         padding: 1.5rem !important;
@@ -246,97 +258,95 @@ def apply_custom_css():
         box-shadow: 0 6px 20px rgba(0,0,0,0.1) !important;
         line-height: 1.6 !important;
         border: 1px solid #e2e8f0 !important;
-    }}
+    }
     
-    .ai-message-content * {{
+    .ai-message-content * {
         color: #2D3748 !important;
-    }}
+    }
     
-    .ai-message-header {{
+    .ai-message-header {
         display: flex !important;
         align-items: center !important;
         margin-bottom: 0.75rem !important;
         padding-bottom: 0.5rem !important;
         border-bottom: 1px solid #f1f3f4 !important;
-    }}
+    }
     
-    .ai-message-header strong {{
+    .ai-message-header strong {
         margin-left: 0.5rem !important;
         color: #1B5E3F !important;
         font-size: 1.1rem !important;
-    }}
+    }
     
     /* Tab styling */
-    .stTabs [data-baseweb="tab-list"] {{
+    .stTabs [data-baseweb="tab-list"] {
         gap: 8px;
         background-color: var(--off-white);
         padding: 0.5rem;
-        border-radius: 12px;
         border: 1px solid var(--border-light);
-    }}
+    }
     
-    .stTabs [data-baseweb="tab"] {{
+    .stTabs [data-baseweb="tab"] {
         height: 50px;
         white-space: pre-wrap;
         background-color: transparent;
         border-radius: 8px;
         color: var(--text-medium) !important;
         font-weight: 500;
-        transition: all 0.3s ease;
+        transition: background-color 0.3s ease, color 0.3s ease;
         border: none;
-    }}
+    }
     
-    .stTabs [aria-selected="true"] {{
+    .stTabs [aria-selected="true"] {
         background-color: white !important;
         color: var(--primary-green) !important;
         font-weight: 600 !important;
-        box-shadow: var(--shadow-sm);
+        box-shadow: 0 1px 3px 0 rgba(0, 0, 0, 0.1), 0 1px 2px 0 rgba(0, 0, 0, 0.06);
         border: 1px solid var(--border-light) !important;
-    }}
+    }
     
     /* Sidebar Styling */
-    section[data-testid="stSidebar"] {{
-        background: var(--gradient-subtle) !important;
+    section[data-testid="stSidebar"] {
+        background: linear-gradient(135deg, #FDFDF8 0%, #F9F9F4 100%) !important;
         border-right: 1px solid var(--border-light);
-    }}
+    }
     
-    section[data-testid="stSidebar"] * {{
+    section[data-testid="stSidebar"] * {
         color: var(--text-dark) !important;
-    }}
+    }
     
     /* Main Container */
-    .main .block-container {{
+    .main .block-container {
         padding: 2rem 1rem;
         max-width: 900px;
         margin: 0 auto;
-    }}
+    }
     
     /* Header Section with Logo */
-    .app-header {{
+    .app-header {
         text-align: center;
         margin-bottom: 3rem;
         padding: 2rem 0;
-    }}
+    }
     
-    .logo-container {{
+    .logo-container {
         display: flex;
         justify-content: center;
         align-items: center;
         margin-bottom: 1.5rem;
         padding: 1rem;
-        background: var(--gradient-subtle);
+        background: linear-gradient(135deg, #FDFDF8 0%, #F9F9F4 100%);
         border-radius: 20px;
-        box-shadow: var(--shadow-md);
         border: 1px solid var(--border-light);
         max-width: 300px;
         margin-left: auto;
         margin-right: auto;
-    }}
+    }
     
-    .logo-placeholder {{
+    .logo-placeholder {
         width: 80px;
         height: 80px;
-        background: var(--gradient-primary);
+        background: linear-gradient(135deg, #1B5E3F 0%, #4A9B6B 100%);
         border-radius: 16px;
         display: flex;
         align-items: center;
@@ -345,24 +355,23 @@ def apply_custom_css():
         font-size: 2rem;
         font-weight: 700;
         margin-right: 1rem;
-        box-shadow: var(--shadow-md);
-        background-image: url('{logo_data_url}');
+        $logo_background
         background-size: contain;
         background-repeat: no-repeat;
         background-position: center;
-    }}
+    }
     
-    .logo-text {{
+    .logo-text {
         color: var(--primary-green);
         font-family: 'Amiri', serif;
         font-size: 2.5rem;
         font-weight: 700;
         margin: 0;
         text-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }}
+    }
     
     /* Typography */
-    h1 {{
+    h1 {
         font-family: 'Amiri', serif !important;
         color: var(--primary-green) !important;
         text-align: center !important;
@@ -370,19 +379,19 @@ def apply_custom_css():
         font-weight: 700 !important;
         margin: 1rem 0 0.5rem 0 !important;
         text-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }}
+    }
     
-    .subtitle {{
+    .subtitle {
         text-align: center;
         color: var(--text-medium);
         font-size: 1.1rem;
         font-style: italic;
         margin-bottom: 2rem;
         font-weight: 400;
-    }}
+    }
     
     /* Enhanced Disclaimer Section */
-    .disclaimer-container {{
+    .disclaimer-container {
         background: linear-gradient(135deg, #FFF8E7 0%, #FFFBF0 100%);
         border: 2px solid var(--accent-gold);
         border-radius: 16px;
@@ -390,29 +399,29 @@ def apply_custom_css():
         margin: 2rem 0;
         position: relative;
         overflow: hidden;
-        box-shadow: var(--shadow-md);
-    }}
+        contain: content;
+    }
     
-    .disclaimer-container::before {{
+    .disclaimer-container::before {
         content: '';
         position: absolute;
         top: 0;
         left: 0;
         right: 0;
         height: 4px;
-        background: var(--gradient-gold);
-    }}
+        background: linear-gradient(135deg, #D4AF37 0%, #E8C547 100%);
+    }
     
-    .disclaimer-container::after {{
+    .disclaimer-container::after {
         content: '☪️';
         position: absolute;
         top: 1rem;
         right: 1.5rem;
         font-size: 1.5rem;
         opacity: 0.3;
-    }}
+    }
     
-    .disclaimer-container h3 {{
+    .disclaimer-container h3 {
         color: var(--primary-green) !important;
         font-family: 'Inter', sans-serif !important;
         font-weight: 600 !important;
@@ -421,237 +430,210 @@ def apply_custom_css():
         align-items: center;
         gap: 0.5rem;
         font-size: 1.3rem !important;
-    }}
+    }
     
-    .disclaimer-container p {{
+    .disclaimer-container p {
         color: var(--text-dark) !important;
         line-height: 1.7 !important;
         font-size: 1rem !important;
         margin: 0 !important;
-    }}
+    }
     
     /* Search Section */
-    .search-container {{
+    .search-container {
         background: white;
         border-radius: 20px;
         padding: 2rem;
         margin: 2rem 0;
-        box-shadow: var(--shadow-lg);
+        box-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.1), 0 4px 6px -2px rgba(0, 0, 0, 0.05);
         border: 1px solid var(--border-light);
-    }}
+        contain: content;
+    }
     
-    .search-label {{
+    .search-label {
         font-weight: 600;
         color: var(--text-dark);
         margin-bottom: 0.5rem;
         font-size: 1.1rem;
         display: block;
-    }}
+    }
     
     /* Controls Section */
-    .controls-container {{
+    .controls-container {
         display: grid;
         grid-template-columns: 1fr 1fr;
         gap: 2rem;
         margin: 1.5rem 0;
-    }}
+    }
     
-    .control-group {{
+    .control-group {
         background: var(--off-white);
-        border-radius: 12px;
         padding: 1.5rem;
         border: 1px solid var(--border-light);
-    }}
+    }
     
-    .control-label {{
+    .control-label {
         font-weight: 600;
         color: var(--text-dark);
         margin-bottom: 1rem;
         font-size: 0.95rem;
         text-transform: uppercase;
         letter-spacing: 0.5px;
-    }}
+    }
     
     /* Enhanced Slider Styling */
-    .stSlider > div > div > div {{
-        background: var(--gradient-primary) !important;
+    .stSlider > div > div > div {
+        background: linear-gradient(135deg, #1B5E3F 0%, #4A9B6B 100%) !important;
         height: 6px !important;
         border-radius: 3px !important;
-    }}
+    }
     
-    .stSlider > div > div > div > div {{
+    .stSlider > div > div > div > div {
         background: white !important;
         border: 3px solid var(--primary-green) !important;
-        box-shadow: var(--shadow-md) !important;
         width: 20px !important;
         height: 20px !important;
         border-radius: 50% !important;
-    }}
-    
-    .stSlider > div > div > div > div:hover {{
-        transform: scale(1.1);
-        transition: transform 0.2s ease;
-    }}
+    }
     
     /* Enhanced Button Styling */
-    .stButton > button {{
-        background: var(--gradient-primary) !important;
+    .stButton > button {
+        background: linear-gradient(135deg, #1B5E3F 0%, #4A9B6B 100%) !important;
         color: white !important;
         border: none !important;
-        border-radius: 12px !important;
         padding: 0.875rem 2rem !important;
         font-weight: 600 !important;
         font-size: 1rem !important;
-        transition: all 0.3s ease !important;
-        box-shadow: var(--shadow-md) !important;
+        transition: transform 0.2s ease, box-shadow 0.2s ease !important;
         text-transform: uppercase !important;
         letter-spacing: 0.5px !important;
         font-family: 'Inter', sans-serif !important;
-    }}
-    
-    .stButton > button:hover {{
-        transform: translateY(-2px) !important;
-        box-shadow: var(--shadow-xl) !important;
-        background: linear-gradient(135deg, #154A33 0%, #1F5F42 100%) !important;
-    }}
-    
-    .stButton > button:active {{
-        transform: translateY(0) !important;
-    }}
+    }
     
     /* Form Container Styling */
-    .stForm {{
+    .stForm {
         background: white !important;
         border-radius: 16px !important;
         padding: 2rem !important;
-        box-shadow: var(--shadow-lg) !important;
+        box-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.1), 0 4px 6px -2px rgba(0, 0, 0, 0.05) !important;
         border: 1px solid var(--border-light) !important;
         margin: 1rem 0 !important;
-    }}
+    }
     
     /* Expandable Content */
-    .streamlit-expanderHeader {{
+    [data-testid="stExpander"] summary {
         background: linear-gradient(135deg, var(--off-white) 0%, var(--soft-gray) 100%) !important;
-        border-radius: 12px !important;
         border: 1px solid var(--border-light) !important;
         color: var(--primary-green) !important;
         font-weight: 600 !important;
         padding: 1rem !important;
-        transition: all 0.3s ease !important;
-    }}
-    
-    .streamlit-expanderHeader:hover {{
-        background: linear-gradient(135deg, var(--soft-gray) 0%, var(--light-gray) 100%) !important;
-        box-shadow: var(--shadow-sm) !important;
-    }}
+        transition: box-shadow 0.3s ease !important;
+    }
     
-    .streamlit-expanderContent {{
+    [data-testid="stExpanderDetails"] {
         border: 1px solid var(--border-light) !important;
         border-top: none !important;
         border-radius: 0 0 12px 12px !important;
         background: white !important;
         padding: 1.5rem !important;
-    }}
+    }
     
     /* Query Display */
-    .query-header {{
-        background: var(--gradient-primary);
+    .query-header {
+        background: linear-gradient(135deg, #1B5E3F 0%, #4A9B6B 100%);
         color: white !important;
         padding: 1.25rem 1.5rem;
         border-radius: 16px;
         margin: 2rem 0 1.5rem 0;
         font-weight: 600;
-        box-shadow: var(--shadow-lg);
+        box-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.1), 0 4px 6px -2px rgba(0, 0, 0, 0.05);
         position: relative;
         overflow: hidden;
         font-size: 1.1rem;
-    }}
+        contain: content;
+    }
     
-    .query-header::before {{
+    .query-header::before {
         content: '🔍';
         margin-right: 0.75rem;
         font-size: 1.3em;
-    }}
+    }
     
     /* Results Container */
-    .results-container {{
+    .results-container {
         margin-top: 2rem;
-    }}
+    }
     
     /* Enhanced Result Cards */
-    .result-card {{
+    .result-card {
         background: white;
         border: 1px solid var(--border-light);
         border-radius: 20px;
         padding: 2rem;
         margin-bottom: 2rem;
-        box-shadow: var(--shadow-md);
-        transition: all 0.3s ease;
+        transition: transform 0.2s ease, box-shadow 0.2s ease, border-color 0.2s ease;
+        will-change: transform;
+        contain: content;
+        /* Off-screen cards skip rendering until scrolled into view */
+        content-visibility: auto;
+        contain-intrinsic-size: auto 200px;
         position: relative;
         overflow: hidden;
-    }}
-    
-    .result-card:hover {{
-        box-shadow: var(--shadow-xl);
-        transform: translateY(-4px);
-        border-color: var(--secondary-green);
-    }}
+    }
     
-    .result-card::before {{
+    .result-card::before {
         content: '';
         position: absolute;
         top: 0;
         left: 0;
         right: 0;
         height: 5px;
-        background: var(--gradient-primary);
-    }}
+        background: linear-gradient(135deg, #1B5E3F 0%, #4A9B6B 100%);
+    }
     
     /* Alert Messages */
-    .stAlert {{
-        border-radius: 12px !important;
+    .stAlert {
         border: none !important;
-        box-shadow: var(--shadow-md) !important;
         padding: 1rem 1.5rem !important;
-    }}
+    }
     
-    .stSuccess {{
+    .stSuccess {
         background: linear-gradient(135deg, #F0FFF4 0%, #E6FFFA 100%) !important;
         border-left: 4px solid var(--success-green) !important;
         color: var(--text-dark) !important;
-    }}
+    }
     
-    .stError {{
+    .stError {
         background: linear-gradient(135deg, #FFF5F5 0%, #FFEBEE 100%) !important;
         border-left: 4px solid var(--error-red) !important;
         color: var(--text-dark) !important;
-    }}
+    }
     
-    .stWarning {{
+    .stWarning {
         background: linear-gradient(135deg, #FFFAF0 0%, #FFF8E1 100%) !important;
         border-left: 4px solid var(--warning-orange) !important;
         color: var(--text-dark) !important;
-    }}
+    }
     
-    .stInfo {{
+    .stInfo {
         background: linear-gradient(135deg, #F7FAFC 0%, #EDF2F7 100%) !important;
         border-left: 4px solid var(--info-blue) !important;
         color: var(--text-dark) !important;
-    }}
+    }
     
     /* Login Container */
-    .login-container {{
+    .login-container {
         max-width: 400px;
         margin: 2rem auto;
         padding: 2rem;
         background: white;
         border-radius: 20px;
-        box-shadow: var(--shadow-xl);
+        box-shadow: 0 20px 25px -5px rgba(0, 0, 0, 0.1), 0 10px 10px -5px rgba(0, 0, 0, 0.04);
         border: 1px solid var(--border-light);
-    }}
+    }
     
     /* CRITICAL: Chat container for better HTML rendering */
-    .chat-container {{
+    .chat-container {
         max-height: 70vh;
         overflow-y: auto;
         padding: 1rem;
@@ -659,115 +641,132 @@ def apply_custom_css():
         background: linear-gradient(135deg, #f8f9fa 0%, #ffffff 100%);
         border: 1px solid #e2e8f0;
         margin: 1rem 0;
-    }}
+    }
     
     /* Feedback container */
-    .feedback-container {{
+    .feedback-container {
         background: linear-gradient(135deg, #F7FAFC 0%, #EDF2F7 100%);
         border-radius: 15px;
         padding: 1rem;
         margin: 1rem 0;
         border: 1px solid #E2E8F0;
-    }}
+    }
     
     /* Responsive Design */
-    @media (max-width: 768px) {{
-        .main .block-container {{
+    @media (max-width: 768px) {
+        .main .block-container {
             padding: 1rem 0.5rem;
-        }}
+        }
         
-        .logo-container {{
+        .logo-container {
             max-width: 250px;
             padding: 0.75rem;
-        }}
+        }
         
-        .logo-placeholder {{
+        .logo-placeholder {
             width: 60px;
             height: 60px;
             font-size: 1.5rem;
-        }}
-        
-        .logo-text {{
-            font-size: 2rem;
-        }}
+        }
         
-        h1 {{
+        h1 {
             font-size: 2.5rem !important;
-        }}
+        }
         
-        .controls-container {{
+        .controls-container {
             grid-template-columns: 1fr;
             gap: 1rem;
-        }}
+        }
         
-        .search-container {{
-            padding: 1.5rem;
-        }}
+        .search-container,
+        .disclaimer-container,
+        .welcome-container {
+            padding: 1.5rem !important;
+        }
         
-        .disclaimer-container {{
-            padding: 1.5rem;
-        }}
+        .logo-text,
+        .welcome-container h2 {
+            font-size: 2rem !important;
+        }
         
         .user-message-content,
-        .ai-message-content {{
+        .ai-message-content {
             max-width: 95% !important;
-        }}
-        
-        .welcome-container {{
-            padding: 1.5rem !important;
-        }}
-        
-        .welcome-container h2 {{
-            font-size: 2rem !important;
-        }}
-    }}
+        }
+    }
     
     /* Custom Scrollbar */
-    ::-webkit-scrollbar {{
+    ::-webkit-scrollbar {
         width: 10px;
-    }}
+    }
     
-    ::-webkit-scrollbar-track {{
+    ::-webkit-scrollbar-track,
+    ::-webkit-scrollbar-thumb {
         background: var(--soft-gray);
         border-radius: 5px;
-    }}
+    }
     
-    ::-webkit-scrollbar-thumb {{
+    ::-webkit-scrollbar-thumb {
         background: var(--primary-green);
-        border-radius: 5px;
         border: 2px solid var(--soft-gray);
-    }}
+    }
     
-    ::-webkit-scrollbar-thumb:hover {{
-        background: var(--secondary-green);
-    }}
+    /* Hover effects only apply to devices with a fine hovering pointer */
+    @media (hover: hover) and (pointer: fine) {
+        .stSlider > div > div > div > div:hover {
+            transform: scale(1.1);
+            transition: transform 0.2s ease;
+        }
+        
+        .stButton > button:hover {
+            transform: translateY(-2px) !important;
+            box-shadow: 0 20px 25px -5px rgba(0, 0, 0, 0.1), 0 10px 10px -5px rgba(0, 0, 0, 0.04) !important;
+            background: linear-gradient(135deg, #154A33 0%, #1F5F42 100%) !important;
+        }
+        
+        [data-testid="stExpander"] summary:hover {
+            background: linear-gradient(135deg, var(--soft-gray) 0%, var(--light-gray) 100%) !important;
+            box-shadow: 0 1px 3px 0 rgba(0, 0, 0, 0.1), 0 1px 2px 0 rgba(0, 0, 0, 0.06) !important;
+        }
+        
+        .result-card:hover {
+            box-shadow: 0 20px 25px -5px rgba(0, 0, 0, 0.1), 0 10px 10px -5px rgba(0, 0, 0, 0.04);
+            transform: translateY(-4px);
+            border-color: var(--secondary-green);
+        }
+        
+        ::-webkit-scrollbar-thumb:hover {
+            background: var(--secondary-green);
+        }
+    }
+    
+    /* Pressed state wins over the hover lift */
+    .stButton > button:active {
+        transform: translateY(0) !important;
+    }
     
     /* Animations */
-    @keyframes fadeInUp {{
-        from {{
+    @keyframes fadeInUp {
+        from {
             opacity: 0;
             transform: translateY(20px);
-        }}
-        to {{
+        }
+        to {
             opacity: 1;
             transform: translateY(0);
-        }}
-    }}
-    
-    .result-card {{
-        animation: fadeInUp 0.5s ease-out;
-    }}
+        }
+    }
     
-    .search-container {{
+    .search-container {
         animation: fadeInUp 0.3s ease-out;
-    }}
+    }
     
-    .disclaimer-container {{
+    .disclaimer-container {
         animation: fadeInUp 0.4s ease-out;
-    }}
+    }
     
     /* Welcome container animation */
-    .welcome-container::before {{
+    .welcome-container::before {
         content: '';
         position: absolute;
         top: -50%;
@@ -776,29 +775,52 @@ def apply_custom_css():
         height: 200%;
         background: radial-gradient(circle, rgba(255,255,255,0.1) 0%, transparent 70%);
         animation: shimmer 3s linear infinite;
-    }}
+    }
     
-    @keyframes shimmer {{
-        0% {{ transform: rotate(0deg); }}
-        100% {{ transform: rotate(360deg); }}
-    }}
+    @keyframes shimmer {
+        0% { transform: rotate(0deg); }
+        100% { transform: rotate(360deg); }
+    }
     </style>
+    """)
+
+
+@st.cache_resource(show_spinner=False)
+def _get_css() -> str:
+    """
+    Build the HalalBot <style> block once per process
+    
+    The stylesheet only depends on the logo file, so reruns reuse this
+    string instead of re-substituting and re-minifying the template.
     """
     
-    # CRITICAL: Use st.html for better CSS injection instead of st.markdown
-    st.components.v1.html(css_content, height=0)
+    # Logo is referenced by its static URL so the browser caches it
+    logo_url = load_static_assets()['logo']
+    logo_background = f"background-image: url('{logo_url}');" if logo_url else ""
     
-    # BACKUP: Also inject via markdown as fallback
-    st.markdown(css_content, unsafe_allow_html=True)
+    return minify_css(_CSS_TEMPLATE.substitute(logo_background=logo_background))
 
 
+def apply_custom_css():
+    """
+    Apply comprehensive modern CSS styling for HalalBot
+    FIXED: Ensures HTML rendering works properly
+    
+    Emitted on every rerun: Streamlit drops elements a rerun does not
+    re-emit, so only the string building is cached (see _get_css).
+    """
+    # Inject via markdown only: a components.v1.html iframe cannot style
+    # the parent page, so a second copy there is pure overhead
+    st.markdown(_get_css(), unsafe_allow_html=True)
+
+
+@lru_cache(maxsize=1)
 def create_app_header():
     """Create the enhanced app header with logo and branding"""
-    # Try to get logo as base64, fallback to emoji if not available
-    logo_base64 = get_base64_image("halalbot_logo.png")
-    
-    if logo_base64:
-        logo_element = f'<img src="data:image/png;base64,{logo_base64}" alt="HalalBot Logo" style="width: 80px; height: 80px; object-fit: contain; margin-right: 1rem;" />'
+    # The logo itself is the .logo-placeholder background set in the CSS;
+    # fall back to the emoji if the file is missing
+    if load_static_assets()['logo']:
+        logo_element = '<div class="logo-placeholder" role="img" aria-label="HalalBot Logo"></div>'
     else:
         logo_element = '<div class="logo-placeholder">☪️</div>'
     
@@ -814,9 +836,10 @@ def create_app_header():
     """
 
 
-def create_disclaimer_section():
-    """Create the enhanced disclaimer section"""
-    return """
+# Static page fragments are module constants; their create_* helpers return them as-is
+
+# Disclaimer shown above the search box
+_DISCLAIMER_HTML = """
     <div class="disclaimer-container">
         <h3>ℹ️ Important Disclaimer</h3>
         <p>🧠 <em>Note: I am an AI assistant trained on the Qur'an, Hadith, and select scholarly sources.</em><br>
@@ -825,58 +848,123 @@ def create_disclaimer_section():
     """
 
 
-def create_search_container():
-    """Create the enhanced search container wrapper"""
-    return """
+def create_disclaimer_section() -> str:
+    """Create the enhanced disclaimer section"""
+    return _DISCLAIMER_HTML
+
+
+# Opening wrapper, closed by the search UI
+_SEARCH_CONTAINER_HTML = """
     <div class="search-container">
     """
 
 
-def create_styled_result_card(result: dict, index: int) -> str:
-    """Create an enhanced styled result card"""
-    source_type = result.get('category', 'other')
-    
-    # Enhanced icons for different source types
-    source_icons = {
-        'quran': '📖',
-        'hadith': '📜',
-        'fatwa': '⚖️',
-        'zakat': '💰',
-        'other': '📚'
-    }
-    
-    icon = source_icons.get(source_type, '📚')
-    source_display = result['source'].replace('.txt', '').replace('_', ' ').title()
-    
-    return f"""
+def create_search_container() -> str:
+    """Create the enhanced search container wrapper"""
+    return _SEARCH_CONTAINER_HTML
+
+
+@lru_cache(maxsize=1)
+def create_page_chrome() -> str:
+    """Create the static page chrome: header, disclaimer and search container"""
+    return create_app_header() + create_disclaimer_section() + create_search_container()
+
+
+def render_intro():
+    """Render the header, disclaimer and search container as one element"""
+    # Pure HTML: st.html skips the frontend Markdown pipeline
+    st.html(create_page_chrome())
+
+
+# Result card markup, filled in per result by create_styled_result_card
+_RESULT_CARD_TEMPLATE = """
     <div class="result-card source-{source_type}">
         <div class="result-text">
-            <strong>{index}.</strong> {result['text']}
+            <strong>{index}.</strong> {text}
         </div>
         <div class="source-info">
             <span class="source-badge">
                 {icon} {source_display}
             </span>
             <span class="score-badge">
-                ⭐ Score: {result['score']:.2f}
+                ⭐ Score: {score:.2f}
             </span>
         </div>
     </div>
     """
 
+# Enhanced icons for different source types
+_SOURCE_ICONS = MappingProxyType({
+    'quran': '📖',
+    'hadith': '📜',
+    'fatwa': '⚖️',
+    'zakat': '💰',
+    'other': '📚'
+})
+
+
+# Underscores in source file names read as spaces
+_UNDERSCORE_TO_SPACE = str.maketrans('_', ' ')
+
+
+@lru_cache(maxsize=4096)
+def _source_display(source: str) -> str:
+    """Turn a source file name into an escaped display title (cached per name)"""
+    if source.endswith('.txt'):
+        source = source[:-4]
+    return escape(source.translate(_UNDERSCORE_TO_SPACE).title())
+
+
+@lru_cache(maxsize=2048)
+def _escape_text(text: str) -> str:
+    """HTML-escape user/document text (results repeat across reruns)"""
+    # Only ever placed in element content, never in attribute values
+    return escape(text, quote=False)
+
+
+def create_styled_result_card(result: dict, index: int) -> str:
+    """Create an enhanced styled result card"""
+    source_type = result.get('category', 'other')
+    
+    return _RESULT_CARD_TEMPLATE.format(
+        source_type=source_type,
+        index=index,
+        text=_escape_text(result['text']),
+        icon=_SOURCE_ICONS.get(source_type, '📚'),
+        source_display=_source_display(result['source']),
+        score=result['score']
+    )
+
+
+def create_results_block(results: list) -> str:
+    """Create the HTML for all result cards as one results container"""
+    cards_html = "".join(
+        create_styled_result_card(result, i) for i, result in enumerate(results, 1)
+    )
+    return f'<div class="results-container">{cards_html}</div>'
+
+
+def render_results(results: list):
+    """
+    Render all result cards as a single HTML element
+    
+    Preferred over calling st.markdown per card: one delta per results
+    list instead of one per result.
+    """
+    st.html(create_results_block(results))
+
 
 def create_query_header(query: str) -> str:
     """Create an enhanced query header"""
     return f"""
     <div class="query-header">
-        Query: <em>{query}</em>
+        Query: <em>{_escape_text(query)}</em>
     </div>
     """
 
 
-def create_no_results_message() -> str:
-    """Create an enhanced no results message"""
-    return """
+# Shown when a search returns nothing
+_NO_RESULTS_HTML = """
     <div class="no-results">
         <h3>No relevant answers found</h3>
         <p>Try adjusting your search terms or lowering the minimum score.</p>
@@ -884,126 +972,95 @@ def create_no_results_message() -> str:
     """
 
 
+def create_no_results_message() -> str:
+    """Create an enhanced no results message"""
+    return _NO_RESULTS_HTML
+
+
+# Search tips, pre-rendered to HTML so the client has no Markdown to parse
+_SEARCH_TIPS = """
+    <p><strong>💡 Search Tips:</strong></p>
+    <ul>
+        <li><strong>Be specific</strong>: Instead of "prayer", try "prayer times" or "prayer requirements"</li>
+        <li><strong>Use Arabic terms</strong>: Try "wudu", "salah", "zakat" for more precise results</li>
+        <li><strong>Ask questions</strong>: "What is the ruling on..." or "How to perform..."</li>
+        <li><strong>Lower the score</strong>: Reduce minimum score for broader results</li>
+        <li><strong>Filter sources</strong>: Use source filters to focus on Quran, Hadith, or Fatwas only</li>
+    </ul>
+    <p><strong>Popular topics</strong>: Prayer, Fasting, Zakat, Hajj, Marriage, Business Ethics, Halal Food</p>
+    """
+
+
 def create_search_tips() -> str:
     """Create helpful search tips content"""
-    return """
-    **💡 Search Tips:**
-    
-    - **Be specific**: Instead of "prayer", try "prayer times" or "prayer requirements"
-    - **Use Arabic terms**: Try "wudu", "salah", "zakat" for more precise results
-    - **Ask questions**: "What is the ruling on..." or "How to perform..."
-    - **Lower the score**: Reduce minimum score for broader results
-    - **Filter sources**: Use source filters to focus on Quran, Hadith, or Fatwas only
-    
-    **Popular topics**: Prayer, Fasting, Zakat, Hajj, Marriage, Business Ethics, Halal Food
-    """
+    return _SEARCH_TIPS
+
+
+# Page config kwargs other than the icon, shared by every rerun
+_PAGE_CONFIG = MappingProxyType({
+    "page_title": "HalalBot - Islamic AI Assistant",
+    "layout": "centered",
+    "initial_sidebar_state": "auto"
+})
 
 
 def apply_page_config():
     """Apply enhanced Streamlit page configuration with favicon"""
-    # Try to set favicon
-    favicon_base64 = get_base64_image("halalbot_favicon.ico")
-    
-    page_config = {
-        "page_title": "HalalBot - Islamic AI Assistant",
-        "page_icon": "☪️",  # Fallback emoji
-        "layout": "centered",
-        "initial_sidebar_state": "auto"
-    }
-    
-    # If we have favicon data, use it
-    if favicon_base64:
-        page_config["page_icon"] = f"data:image/x-icon;base64,{favicon_base64}"
+    # Fall back to the emoji if the favicon file is missing
+    page_icon = load_static_assets()['favicon'] or "☪️"
+    st.set_page_config(page_icon=page_icon, **_PAGE_CONFIG)
     
-    st.set_page_config(**page_config)
+    # Font links go out right after page config, ahead of any UI
+    st.markdown(_FONT_LINKS, unsafe_allow_html=True)
 
 
+@st.cache_resource(show_spinner=False)
 def load_static_assets():
     """
     Load and prepare static assets for the application
     This function ensures assets are properly loaded and cached
+    
+    Cached once per process and shared by every session; the CSS and page
+    config read their asset URLs/paths from here.
     """
-    assets = {}
+    static_files = _static_files()
     
-    # Try to load logo
-    logo_base64 = get_base64_image("halalbot_logo.png")
-    if logo_base64:
-        assets['logo'] = f"data:image/png;base64,{logo_base64}"
-        print("✅ Logo loaded successfully")
+    # Logo is served statically, not inlined
+    logo_url = None
+    if "halalbot_logo.png" in static_files:
+        logo_url = f"{_STATIC_URL}/halalbot_logo.png"
+        logger.info("Logo loaded successfully")
     else:
-        print("⚠️ Logo not found, using fallback")
-        assets['logo'] = None
-    
-    # Try to load favicon
-    favicon_base64 = get_base64_image("halalbot_favicon.ico")
-    if favicon_base64:
-        assets['favicon'] = f"data:image/x-icon;base64,{favicon_base64}"
-        print("✅ Favicon loaded successfully")
+        logger.warning("Logo not found, using fallback")
+    
+    # Favicon is a local path; set_page_config loads it itself
+    favicon = None
+    if "halalbot_favicon.ico" in static_files:
+        favicon = str(_STATIC_DIR / "halalbot_favicon.ico")
+        logger.info("Favicon loaded successfully")
     else:
-        print("⚠️ Favicon not found, using fallback")
-        assets['favicon'] = None
+        logger.warning("Favicon not found, using fallback")
     
-    return assets
+    # Read-only: the same mapping is shared by every session
+    return MappingProxyType({'logo': logo_url, 'favicon': favicon})
 
 
 def test_static_files():
     """Test function to check if static files are accessible"""
-    print("🔍 Testing static file access...")
-    
-    # Check current working directory
-    cwd = os.getcwd()
-    print(f"Current working directory: {cwd}")
-    
-    # List files in current directory
-    files = os.listdir(".")
-    print(f"Files in current directory: {files}")
+    logger.debug("Testing static file access in %s", _STATIC_DIR)
     
-    # Check if static directory exists
-    if os.path.exists("static"):
-        static_files = os.listdir("static")
-        print(f"Files in static directory: {static_files}")
-        
-        # Check specific files
-        logo_exists = os.path.exists("static/halalbot_logo.png")
-        favicon_exists = os.path.exists("static/halalbot_favicon.ico")
-        
-        print(f"Logo exists: {logo_exists}")
-        print(f"Favicon exists: {favicon_exists}")
-        
-        return logo_exists, favicon_exists
-    else:
-        print("❌ Static directory not found")
-        return False, False
-
-
-def force_html_rendering():
-    """
-    Force HTML rendering capability in Streamlit
-    This function ensures unsafe_allow_html works properly
-    """
+    static_files = _static_files()
+    logo_exists = "halalbot_logo.png" in static_files
+    favicon_exists = "halalbot_favicon.ico" in static_files
     
-    # Method 1: Inject HTML rendering enabler
-    html_enabler = """
-    <style>
-    /* Force HTML rendering */
-    .stMarkdown [data-testid="stMarkdownContainer"] {
-        color: inherit !important;
-    }
+    logger.info("Logo exists: %s, favicon exists: %s", logo_exists, favicon_exists)
     
-    /* Enable HTML content rendering */
-    .stMarkdown > div {
-        color: inherit !important;
-    }
-    </style>
-    <script>
-    // Enable HTML rendering
-    if (window.parent) {
-        window.parent.postMessage({type: 'enableHTML'}, '*');
-    }
-    </script>
-    """
+    # Directory listings are only useful when debugging a deployment
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Current working directory: %s", os.getcwd())
+        logger.debug("Files in static directory: %s", sorted(static_files))
     
-    st.components.v1.html(html_enabler, height=0)
+    return logo_exists, favicon_exists
 
 
 if __name__ == "__main__":
@@ -1,37 +1,282 @@
 import os
+import csv
+import io
+import json
 import psycopg2
-from psycopg2.extras import RealDictCursor, Json
-from psycopg2.pool import SimpleConnectionPool
-from psycopg2 import OperationalError, DatabaseError
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor, Json, execute_values, execute_batch
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2 import OperationalError, DatabaseError, InterfaceError
 import streamlit as st
 from contextlib import contextmanager
 import logging
+import random
+import re
+import threading
 import time
-from typing import Optional, List, Dict, Any, Tuple
+import weakref
+from collections import deque
+from typing import Optional, List, Dict, Any, Tuple, Iterable
+
+# orjson is optional: a faster drop-in for json.dumps on JSONB values
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def dumps_json(value: Any) -> str:
+    """Serialize a JSONB value, using orjson when it is installed"""
+    if orjson is not None:
+        # OPT_NON_STR_KEYS: accept int etc. dict keys like json.dumps does
+        return orjson.dumps(
+            value, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        ).decode('utf-8')
+    return json.dumps(value)
+
+
+class FastJson(Json):
+    """
+    psycopg2 Json adapter that serializes with dumps_json
+    
+    Wrap JSONB query parameters in it explicitly, e.g. FastJson(metadata);
+    it is deliberately not registered for dict globally.
+    """
+    
+    def dumps(self, obj):
+        return dumps_json(obj)
+
+
+# "VALUES (%s, %s, ...)" row tuple of an INSERT, allowing one level of
+# nested parentheses for casts/functions such as "(%s::jsonb, now())"
+_VALUES_TUPLE_RE = re.compile(r"VALUES\s*(\((?:[^()]|\([^()]*\))*\))", re.IGNORECASE)
+
+# psycopg2 query placeholders (%s or %(name)s, not an escaped %%s)
+_PLACEHOLDER_RE = re.compile(r"(?<!%)%(?:\(\w+\))?s")
+
+# execute_many logs its progress every this many pages
+_PROGRESS_EVERY_PAGES = 50
+
+# Queued log rows (enqueue_log) are flushed this often (seconds), or as
+# soon as any one queue holds _LOG_FLUSH_ROWS rows
+_LOG_FLUSH_INTERVAL = 0.5
+_LOG_FLUSH_ROWS = 500
+# Rows kept per table while the database is unreachable; older ones are dropped
+_LOG_MAX_QUEUED_ROWS = 50000
+
+# Rows buffered in memory per COPY chunk in bulk_copy
+_COPY_CHUNK_ROWS = 50000
+
+# Tables the application needs; created by setup_database when missing
+REQUIRED_TABLES = (
+    'users', 
+    'invite_codes', 
+    'documents', 
+    'search_queries', 
+    'feedback',
+    'blocked_queries'
+)
+
+# Pooled connections idle longer than this (seconds) are pinged before use
+_PING_AFTER_IDLE = 30.0
+
+# Server-side prepared statements created once on each pooled connection,
+# run with DatabaseManager.execute_prepared
+PREPARED_STATEMENTS = {
+    'halalbot_auth_select': (
+        "(text) AS SELECT password_hash, is_admin FROM users WHERE lower(email) = $1"
+    ),
+}
+
+# Tables created by setup_database
+_SCHEMA_SQL = """
+-- Enable necessary extensions
+CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+
+-- Users table
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    email VARCHAR(255) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    is_admin BOOLEAN DEFAULT FALSE,
+    invite_code VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_login TIMESTAMP,
+    is_active BOOLEAN DEFAULT TRUE
+);
+
+-- Invite codes table  
+CREATE TABLE IF NOT EXISTS invite_codes (
+    code VARCHAR(50) PRIMARY KEY,
+    used BOOLEAN DEFAULT FALSE,
+    used_by_email VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    used_at TIMESTAMP,
+    created_by_admin_id INTEGER REFERENCES users(id)
+);
+
+-- Documents table (using JSONB for embeddings instead of vector type)
+CREATE TABLE IF NOT EXISTS documents (
+    id SERIAL PRIMARY KEY,
+    doc_id VARCHAR(255) UNIQUE,
+    text TEXT NOT NULL,
+    source VARCHAR(255),
+    category VARCHAR(50) NOT NULL,
+    title TEXT,
+    question TEXT,
+    answer TEXT,
+    page INTEGER,
+    doc_type VARCHAR(50),
+    embedding_json JSONB,
+    metadata JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Search queries log
+CREATE TABLE IF NOT EXISTS search_queries (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
+    query TEXT NOT NULL,
+    results_count INTEGER DEFAULT 0,
+    source_filter VARCHAR(50),
+    min_score FLOAT,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Feedback table
+CREATE TABLE IF NOT EXISTS feedback (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
+    document_id INTEGER REFERENCES documents(id) ON DELETE CASCADE,
+    query TEXT NOT NULL,
+    feedback_type VARCHAR(10) NOT NULL CHECK (feedback_type IN ('up', 'down')),
+    text_hash VARCHAR(64),
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Blocked queries log
+CREATE TABLE IF NOT EXISTS blocked_queries (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
+    query TEXT NOT NULL,
+    blocked_reason VARCHAR(255),
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Indexes created by _create_indexes
+_INDEXES_SQL = """
+-- Performance indexes
+CREATE INDEX IF NOT EXISTS idx_documents_category ON documents(category);
+CREATE INDEX IF NOT EXISTS idx_documents_source ON documents(source);
+CREATE INDEX IF NOT EXISTS idx_documents_text_search ON documents USING gin(to_tsvector('english', text));
+
+-- Foreign key indexes
+CREATE INDEX IF NOT EXISTS idx_feedback_document_id ON feedback(document_id);
+CREATE INDEX IF NOT EXISTS idx_feedback_user_id ON feedback(user_id);
+CREATE INDEX IF NOT EXISTS idx_search_queries_user_id ON search_queries(user_id);
+CREATE INDEX IF NOT EXISTS idx_blocked_queries_user_id ON blocked_queries(user_id);
+
+-- Timestamp indexes for analytics
+CREATE INDEX IF NOT EXISTS idx_search_queries_timestamp ON search_queries(timestamp);
+CREATE INDEX IF NOT EXISTS idx_feedback_timestamp ON feedback(timestamp);
+CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at);
+
+-- Composite indexes for common queries
+CREATE INDEX IF NOT EXISTS idx_documents_category_source ON documents(category, source);
+CREATE INDEX IF NOT EXISTS idx_feedback_type_timestamp ON feedback(feedback_type, timestamp);
+
+-- Partial index for unused invite code lookups
+CREATE INDEX IF NOT EXISTS idx_invite_codes_unused ON invite_codes(code) WHERE used = false;
+"""
+
+# Case-insensitive email uniqueness; every users query matches on
+# lower(email). Created separately so duplicate case-variant emails in an
+# existing table don't roll back the other indexes.
+_USERS_EMAIL_INDEX_SQL = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email_lower ON users (lower(email));
+"""
+
+# updated_at trigger created by _create_triggers
+_TRIGGERS_SQL = """
+-- Function to update updated_at timestamp
+CREATE OR REPLACE FUNCTION update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+-- Trigger for documents table
+DROP TRIGGER IF EXISTS update_documents_updated_at ON documents;
+CREATE TRIGGER update_documents_updated_at
+    BEFORE UPDATE ON documents
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+"""
+
+# Health check plus the required tables that exist, in one query
+_STATUS_SQL = """
+SELECT 1 AS ok, array(
+    SELECT table_name::text
+    FROM information_schema.tables 
+    WHERE table_schema = 'public' AND table_name = ANY(%s)
+) AS existing
+"""
+
+def _missing_tables(status: Dict[str, Any]) -> List[str]:
+    """Required tables absent from a _STATUS_SQL row"""
+    return [table for table in REQUIRED_TABLES if table not in status['existing']]
+
 class DatabaseManager:
     """
     Production-ready PostgreSQL database manager with connection pooling
     Designed for Railway deployment with fallback for local development
     """
     
-    def __init__(self, min_connections: int = 1, max_connections: int = 20):
+    def __init__(self, min_connections: Optional[int] = None, max_connections: Optional[int] = None):
         """
         Initialize database manager with connection pooling
         
         Args:
-            min_connections: Minimum connections in pool
-            max_connections: Maximum connections in pool
+            min_connections: Minimum connections in pool (default DB_POOL_MIN or 1)
+            max_connections: Maximum connections in pool (default DB_POOL_MAX or 20)
         """
-        self.pool: Optional[SimpleConnectionPool] = None
+        if min_connections is None:
+            min_connections = int(os.getenv('DB_POOL_MIN', '1'))
+        if max_connections is None:
+            max_connections = int(os.getenv('DB_POOL_MAX', '20'))
+        
+        self.pool: Optional[ThreadedConnectionPool] = None
+        # Connections that already have PREPARED_STATEMENTS (psycopg2
+        # connections don't take custom attributes, so track them here)
+        self._prepared_connections = weakref.WeakSet()
+        # When each connection was last returned to the pool
+        self._last_used = weakref.WeakKeyDictionary()
         self.min_connections = min_connections
         self.max_connections = max_connections
         self.database_url = self._get_database_url()
         self._initialize_pool()
+        
+        # Bulk loads per table in this process, so caches of table contents
+        # (e.g. the search document index) know to reload
+        self._table_writes: Dict[str, int] = {}
+        
+        # Batched log writes: (table, columns, template) -> queued rows
+        self._log_queues: Dict[tuple, deque] = {}
+        self._log_lock = threading.Lock()
+        self._log_wakeup = threading.Event()
+        self._log_stop = threading.Event()
+        self._log_flusher = threading.Thread(
+            target=self._run_log_flusher, name="halalbot-db-log", daemon=True
+        )
+        self._log_flusher.start()
     
     def _get_database_url(self) -> str:
         """
@@ -77,14 +322,14 @@ class DatabaseManager:
         
         Args:
             max_retries: Maximum connection attempts
-            retry_delay: Delay between retry attempts in seconds
+            retry_delay: Base delay between retry attempts in seconds
             
         Raises:
             OperationalError: If unable to establish database connection
         """
         for attempt in range(max_retries):
             try:
-                self.pool = SimpleConnectionPool(
+                self.pool = ThreadedConnectionPool(
                     minconn=self.min_connections,
                     maxconn=self.max_connections,
                     dsn=self.database_url,
@@ -103,12 +348,17 @@ class DatabaseManager:
                 return
                 
             except OperationalError as e:
-                logger.warning(f"Database connection attempt {attempt + 1}/{max_retries} failed: {e}")
-                
                 if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    retry_delay *= 1.5  # Exponential backoff
+                    # Capped exponential backoff with full jitter, so replicas
+                    # don't all reconnect at once when the database restarts
+                    delay = min(retry_delay * (2 ** attempt), 30.0)
+                    logger.warning(
+                        f"Database connection attempt {attempt + 1}/{max_retries} failed: {e}; "
+                        f"retrying within {delay:.1f}s"
+                    )
+                    time.sleep(random.uniform(0, delay))
                 else:
+                    logger.warning(f"Database connection attempt {attempt + 1}/{max_retries} failed: {e}")
                     logger.error("Failed to establish database connection after all retries")
                     raise OperationalError(f"Unable to connect to database: {e}")
             
@@ -132,16 +382,10 @@ class DatabaseManager:
             if not self.pool:
                 raise OperationalError("Database pool not initialized")
             
-            conn = self.pool.getconn()
-            
-            if conn is None:
-                raise OperationalError("Unable to get connection from pool")
+            conn = self._get_live_connection()
             
-            # Test connection is still alive
-            if conn.closed:
-                logger.warning("Got closed connection from pool, recreating...")
-                self.pool.putconn(conn, close=True)
-                conn = self.pool.getconn()
+            if conn not in self._prepared_connections:
+                self._prepare_statements(conn)
             
             yield conn
             
@@ -152,8 +396,108 @@ class DatabaseManager:
             raise
         finally:
             if conn:
+                self._last_used[conn] = time.monotonic()
                 self.pool.putconn(conn)
     
+    @contextmanager
+    def transaction(self):
+        """
+        Run several statements on one connection and cursor, committed once
+        
+        Yields:
+            Tuple of (connection, RealDictCursor)
+        """
+        with self.get_connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                yield conn, cursor
+            conn.commit()
+    
+    def _get_live_connection(self):
+        """
+        Get a connection from the pool that is known to be alive
+        
+        Connections idle for more than _PING_AFTER_IDLE seconds are pinged
+        with SELECT 1, since the server may have dropped them without
+        conn.closed noticing. Dead connections are discarded and replaced.
+        
+        Raises:
+            OperationalError: If no live connection could be obtained
+        """
+        for _ in range(self.max_connections + 1):
+            conn = self.pool.getconn()
+            
+            if conn is None:
+                raise OperationalError("Unable to get connection from pool")
+            
+            if not conn.closed:
+                # Connections the pool just opened have no entry yet
+                idle = time.monotonic() - self._last_used.get(conn, time.monotonic())
+                if idle < _PING_AFTER_IDLE:
+                    return conn
+                
+                try:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                    return conn
+                except (OperationalError, InterfaceError):
+                    pass
+            
+            logger.warning("Got dead connection from pool, recreating...")
+            self.pool.putconn(conn, close=True)
+        
+        raise OperationalError("Unable to get a live connection from pool")
+    
+    def _prepare_statements(self, conn):
+        """
+        PREPARE the hot-path statements on a freshly checked out connection
+        
+        Skipped quietly (and retried on the next checkout) if the schema
+        isn't set up yet.
+        """
+        try:
+            with conn.cursor() as cursor:
+                for name, statement in PREPARED_STATEMENTS.items():
+                    cursor.execute(f"PREPARE {name} {statement}")
+            conn.commit()
+            self._prepared_connections.add(conn)
+            
+        except DatabaseError as e:
+            if not conn.closed:
+                conn.rollback()
+            logger.debug(f"Could not prepare statements: {e}")
+    
+    def execute_prepared(self, name: str, params: tuple, fetch_one: bool = True) -> Any:
+        """
+        Run a statement from PREPARED_STATEMENTS
+        
+        Args:
+            name: Prepared statement name
+            params: Statement parameters tuple
+            fetch_one: Whether to fetch only one result
+            
+        Returns:
+            Query results
+            
+        Raises:
+            DatabaseError: If execution fails
+        """
+        if name not in PREPARED_STATEMENTS:
+            raise ValueError(f"Unknown prepared statement: {name}")
+        
+        query = f"EXECUTE {name} ({', '.join(['%s'] * len(params))})"
+        
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    cursor.execute(query, params)
+                    result = cursor.fetchone() if fetch_one else cursor.fetchall()
+                    conn.commit()
+                    return result
+                    
+        except Exception as e:
+            logger.error(f"Prepared statement {name} failed: {e}")
+            raise DatabaseError(f"Prepared statement execution failed: {e}")
+    
     def execute_query(self, 
                      query: str, 
                      params: Optional[tuple] = None, 
@@ -195,16 +539,29 @@ class DatabaseManager:
             logger.error(f"Query execution failed: {query[:100]}... Error: {e}")
             raise DatabaseError(f"Query execution failed: {e}")
     
-    def execute_many(self, query: str, params_list: List[tuple]) -> int:
+    def execute_many(self,
+                     query: str,
+                     params_list: List[tuple],
+                     template: Optional[str] = None,
+                     page_size: int = 1000) -> int:
         """
         Execute query with multiple parameter sets (batch insert/update)
         
+        INSERT ... VALUES (%s, ...) statements are sent through execute_values
+        as multi-row INSERTs; anything else goes through execute_batch. Either
+        way rows are sent page_size at a time instead of one roundtrip per row,
+        all in one transaction.
+        
         Args:
             query: SQL query string with placeholders
             params_list: List of parameter tuples
+            template: Row template for INSERTs, defaults to the query's VALUES tuple
+                      (pass it with an INSERT already written as "VALUES %s")
+            page_size: Number of rows sent per statement/roundtrip
             
         Returns:
-            Number of affected rows
+            Number of affected rows (approximate for non-INSERT statements,
+            where only the last statement of each page is counted)
             
         Raises:
             DatabaseError: If batch execution fails
@@ -213,17 +570,131 @@ class DatabaseManager:
             logger.warning("execute_many called with empty params_list")
             return 0
         
+        # A single row needs no batching (unless the query is already in
+        # the "VALUES %s" form, which only execute_values understands)
+        if len(params_list) == 1 and template is None:
+            return self.execute_query(query, params_list[0])
+        
+        is_insert = query.lstrip()[:6].upper() == 'INSERT'
+        match = _VALUES_TUPLE_RE.search(query) if is_insert else None
+        values_query, values_template = query, template
+        if match:
+            values_template = template or match.group(1)
+            values_query = query[:match.start(1)] + '%s' + query[match.end(1):]
+        
+        # execute_values needs the VALUES list to be the query's only
+        # placeholder; anything else (e.g. "ON CONFLICT ... DO UPDATE SET
+        # b = %s") is sent unchanged through execute_batch
+        use_values = bool(
+            (match or (is_insert and template))
+            and len(_PLACEHOLDER_RE.findall(values_query)) == 1
+        )
+        if use_values:
+            query, template = values_query, values_template
+        
+        total_pages = (len(params_list) + page_size - 1) // page_size
+        
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.executemany(query, params_list)
+                    rowcount = 0
+                    
+                    # One statement per page, summing rowcounts as we go
+                    for page, start in enumerate(range(0, len(params_list), page_size), 1):
+                        chunk = params_list[start:start + page_size]
+                        
+                        if use_values:
+                            execute_values(cursor, query, chunk,
+                                           template=template, page_size=page_size)
+                        else:
+                            execute_batch(cursor, query, chunk, page_size=page_size)
+                        rowcount += max(cursor.rowcount, 0)
+                        
+                        if page % _PROGRESS_EVERY_PAGES == 0:
+                            logger.info(f"execute_many: {page}/{total_pages} pages sent")
+                    
                     conn.commit()
-                    return cursor.rowcount
+                    return rowcount
                     
         except Exception as e:
             logger.error(f"Batch execution failed: {query[:100]}... Error: {e}")
             raise DatabaseError(f"Batch execution failed: {e}")
     
+    def bulk_copy(self, table: str, columns: List[str], rows: Iterable[tuple]) -> int:
+        """
+        Bulk load rows with COPY FROM STDIN (fast path for document ingestion)
+        
+        Rows are written as tab-delimited CSV into an in-memory buffer and
+        streamed to the server _COPY_CHUNK_ROWS at a time, all in a single
+        transaction. None becomes NULL; dicts and lists (JSONB columns such
+        as embedding_json/metadata) are serialized with dumps_json.
+        
+        Args:
+            table: Target table name
+            columns: Column names, in the order of each row tuple
+            rows: Iterable of row tuples
+            
+        Returns:
+            Number of rows copied
+            
+        Raises:
+            DatabaseError: If the copy fails
+        """
+        copy_sql = sql.SQL(
+            "COPY {} ({}) FROM STDIN WITH (FORMAT CSV, DELIMITER E'\\t', NULL '\\N')"
+        ).format(sql.Identifier(table), sql.SQL(',').join(map(sql.Identifier, columns)))
+        
+        def _field(value):
+            if value is None:
+                return '\\N'
+            if isinstance(value, (dict, list)):
+                return dumps_json(value)
+            return value
+        
+        total = 0
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    copy_stmt = copy_sql.as_string(cursor)
+                    buf = io.StringIO()
+                    writer = csv.writer(buf, delimiter='\t', quoting=csv.QUOTE_MINIMAL)
+                    pending = 0
+                    
+                    for row in rows:
+                        writer.writerow([_field(value) for value in row])
+                        pending += 1
+                        
+                        if pending == _COPY_CHUNK_ROWS:
+                            buf.seek(0)
+                            cursor.copy_expert(copy_stmt, buf)
+                            total += pending
+                            buf.seek(0)
+                            buf.truncate()
+                            pending = 0
+                    
+                    if pending:
+                        buf.seek(0)
+                        cursor.copy_expert(copy_stmt, buf)
+                        total += pending
+                    
+                    conn.commit()
+            
+            self._table_writes[table] = self._table_writes.get(table, 0) + 1
+            logger.info(f"Copied {total} rows into {table}")
+            return total
+            
+        except Exception as e:
+            logger.error(f"Bulk copy into {table} failed: {e}")
+            raise DatabaseError(f"Bulk copy failed: {e}")
+    
+    def table_write_count(self, table: str) -> int:
+        """
+        Number of bulk loads into a table by this process
+        
+        Caches built from a table compare this to know when to reload.
+        """
+        return self._table_writes.get(table, 0)
+    
     def check_tables_exist(self) -> Tuple[bool, List[str]]:
         """
         Check if all required tables exist in the database
@@ -231,15 +702,6 @@ class DatabaseManager:
         Returns:
             Tuple of (all_exist: bool, missing_tables: List[str])
         """
-        required_tables = [
-            'users', 
-            'invite_codes', 
-            'documents', 
-            'search_queries', 
-            'feedback',
-            'blocked_queries'
-        ]
-        
         try:
             query = """
             SELECT table_name 
@@ -247,12 +709,13 @@ class DatabaseManager:
             WHERE table_schema = 'public' AND table_name = ANY(%s)
             """
             
-            existing_tables = self.execute_query(query, (required_tables,), fetch=True)
+            # psycopg2 adapts lists (not tuples) to arrays
+            existing_tables = self.execute_query(query, (list(REQUIRED_TABLES),), fetch=True)
             existing_names = {table['table_name'] for table in existing_tables}
             
-            missing_tables = [table for table in required_tables if table not in existing_names]
+            missing_tables = [table for table in REQUIRED_TABLES if table not in existing_names]
             
-            logger.info(f"Found {len(existing_names)} of {len(required_tables)} required tables")
+            logger.info(f"Found {len(existing_names)} of {len(REQUIRED_TABLES)} required tables")
             if missing_tables:
                 logger.info(f"Missing tables: {missing_tables}")
             
@@ -260,7 +723,7 @@ class DatabaseManager:
             
         except Exception as e:
             logger.error(f"Failed to check table existence: {e}")
-            return False, required_tables
+            return False, list(REQUIRED_TABLES)
     
     def setup_database(self):
         """
@@ -272,182 +735,87 @@ class DatabaseManager:
         """
         logger.info("Setting up database schema...")
         
-        # Main schema creation
-        schema_sql = """
-        -- Enable necessary extensions
-        CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
-        
-        -- Users table
-        CREATE TABLE IF NOT EXISTS users (
-            id SERIAL PRIMARY KEY,
-            email VARCHAR(255) UNIQUE NOT NULL,
-            password_hash VARCHAR(255) NOT NULL,
-            is_admin BOOLEAN DEFAULT FALSE,
-            invite_code VARCHAR(50),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_login TIMESTAMP,
-            is_active BOOLEAN DEFAULT TRUE
-        );
-        
-        -- Invite codes table  
-        CREATE TABLE IF NOT EXISTS invite_codes (
-            code VARCHAR(50) PRIMARY KEY,
-            used BOOLEAN DEFAULT FALSE,
-            used_by_email VARCHAR(255),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            used_at TIMESTAMP,
-            created_by_admin_id INTEGER REFERENCES users(id)
-        );
-        
-        -- Documents table (using JSONB for embeddings instead of vector type)
-        CREATE TABLE IF NOT EXISTS documents (
-            id SERIAL PRIMARY KEY,
-            doc_id VARCHAR(255) UNIQUE,
-            text TEXT NOT NULL,
-            source VARCHAR(255),
-            category VARCHAR(50) NOT NULL,
-            title TEXT,
-            question TEXT,
-            answer TEXT,
-            page INTEGER,
-            doc_type VARCHAR(50),
-            embedding_json JSONB,
-            metadata JSONB,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        
-        -- Search queries log
-        CREATE TABLE IF NOT EXISTS search_queries (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
-            query TEXT NOT NULL,
-            results_count INTEGER DEFAULT 0,
-            source_filter VARCHAR(50),
-            min_score FLOAT,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        
-        -- Feedback table
-        CREATE TABLE IF NOT EXISTS feedback (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
-            document_id INTEGER REFERENCES documents(id) ON DELETE CASCADE,
-            query TEXT NOT NULL,
-            feedback_type VARCHAR(10) NOT NULL CHECK (feedback_type IN ('up', 'down')),
-            text_hash VARCHAR(64),
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        
-        -- Blocked queries log
-        CREATE TABLE IF NOT EXISTS blocked_queries (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
-            query TEXT NOT NULL,
-            blocked_reason VARCHAR(255),
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        """
-        
         try:
-            # Execute schema creation
-            with self.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(schema_sql)
-                    conn.commit()
-            
-            logger.info("Database schema created successfully")
-            
-            # Create indexes for performance
-            self._create_indexes()
-            
-            # Create triggers for updated_at
-            self._create_triggers()
-            
+            with self.transaction() as (conn, cursor):
+                self._setup_schema(cursor)
+                
         except Exception as e:
             logger.error(f"Schema creation failed: {e}")
             raise DatabaseError(f"Failed to setup database schema: {e}")
     
-    def _create_indexes(self):
-        """Create database indexes for optimal query performance"""
-        indexes_sql = """
-        -- Performance indexes
-        CREATE INDEX IF NOT EXISTS idx_documents_category ON documents(category);
-        CREATE INDEX IF NOT EXISTS idx_documents_source ON documents(source);
-        CREATE INDEX IF NOT EXISTS idx_documents_text_search ON documents USING gin(to_tsvector('english', text));
-        
-        -- Foreign key indexes
-        CREATE INDEX IF NOT EXISTS idx_feedback_document_id ON feedback(document_id);
-        CREATE INDEX IF NOT EXISTS idx_feedback_user_id ON feedback(user_id);
-        CREATE INDEX IF NOT EXISTS idx_search_queries_user_id ON search_queries(user_id);
-        CREATE INDEX IF NOT EXISTS idx_blocked_queries_user_id ON blocked_queries(user_id);
-        
-        -- Timestamp indexes for analytics
-        CREATE INDEX IF NOT EXISTS idx_search_queries_timestamp ON search_queries(timestamp);
-        CREATE INDEX IF NOT EXISTS idx_feedback_timestamp ON feedback(timestamp);
-        CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at);
+    def _setup_schema(self, cursor):
+        """
+        Create tables, indexes and triggers on an open transaction's cursor
         
-        -- Composite indexes for common queries
-        CREATE INDEX IF NOT EXISTS idx_documents_category_source ON documents(category, source);
-        CREATE INDEX IF NOT EXISTS idx_feedback_type_timestamp ON feedback(feedback_type, timestamp);
+        Index and trigger failures are logged and rolled back to a savepoint
+        so they don't abort the table creation.
         """
+        # Execute schema creation
+        cursor.execute(_SCHEMA_SQL)
+        logger.info("Database schema created successfully")
+        
+        # Create indexes for performance
+        self._create_indexes(cursor)
         
+        # Create triggers for updated_at
+        self._create_triggers(cursor)
+    
+    def _create_indexes(self, cursor):
+        """Create database indexes for optimal query performance"""
         try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(indexes_sql)
-                    conn.commit()
+            cursor.execute("SAVEPOINT create_indexes")
+            cursor.execute(_INDEXES_SQL)
+            cursor.execute("RELEASE SAVEPOINT create_indexes")
             logger.info("Database indexes created successfully")
             
-        except Exception as e:
+        except DatabaseError as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT create_indexes")
             logger.warning(f"Some indexes could not be created: {e}")
+        
+        try:
+            cursor.execute("SAVEPOINT create_email_index")
+            cursor.execute(_USERS_EMAIL_INDEX_SQL)
+            cursor.execute("RELEASE SAVEPOINT create_email_index")
+            
+        except DatabaseError as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT create_email_index")
+            logger.error(f"Could not create unique lower(email) index (case-variant duplicate users?): {e}")
     
-    def _create_triggers(self):
+    def _create_triggers(self, cursor):
         """Create database triggers for automatic timestamp updates"""
-        triggers_sql = """
-        -- Function to update updated_at timestamp
-        CREATE OR REPLACE FUNCTION update_updated_at_column()
-        RETURNS TRIGGER AS $$
-        BEGIN
-            NEW.updated_at = CURRENT_TIMESTAMP;
-            RETURN NEW;
-        END;
-        $$ language 'plpgsql';
-        
-        -- Trigger for documents table
-        DROP TRIGGER IF EXISTS update_documents_updated_at ON documents;
-        CREATE TRIGGER update_documents_updated_at
-            BEFORE UPDATE ON documents
-            FOR EACH ROW
-            EXECUTE FUNCTION update_updated_at_column();
-        """
-        
         try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(triggers_sql)
-                    conn.commit()
+            cursor.execute("SAVEPOINT create_triggers")
+            cursor.execute(_TRIGGERS_SQL)
+            cursor.execute("RELEASE SAVEPOINT create_triggers")
             logger.info("Database triggers created successfully")
             
-        except Exception as e:
+        except DatabaseError as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT create_triggers")
             logger.warning(f"Could not create triggers: {e}")
     
     def get_database_stats(self) -> Dict[str, Any]:
         """
         Get database statistics for monitoring
         
+        Table row counts are the planner's live-tuple estimates.
+        
         Returns:
             Dictionary with database statistics
         """
         try:
+            # Row counts come from planner statistics (approximate, no table
+            # scans); only the small invite_codes table is counted exactly
             stats_query = """
             SELECT 
-                (SELECT COUNT(*) FROM users) as user_count,
-                (SELECT COUNT(*) FROM documents) as document_count,
-                (SELECT COUNT(*) FROM search_queries) as query_count,
-                (SELECT COUNT(*) FROM feedback) as feedback_count,
+                COALESCE(MAX(n_live_tup) FILTER (WHERE relname = 'users'), 0) as user_count,
+                COALESCE(MAX(n_live_tup) FILTER (WHERE relname = 'documents'), 0) as document_count,
+                COALESCE(MAX(n_live_tup) FILTER (WHERE relname = 'search_queries'), 0) as query_count,
+                COALESCE(MAX(n_live_tup) FILTER (WHERE relname = 'feedback'), 0) as feedback_count,
                 (SELECT COUNT(*) FROM invite_codes WHERE used = false) as unused_codes,
-                (SELECT pg_size_pretty(pg_database_size(current_database()))) as database_size
+                pg_size_pretty(pg_database_size(current_database())) as database_size
+            FROM pg_stat_user_tables
+            WHERE schemaname = 'public'
+              AND relname IN ('users', 'documents', 'search_queries', 'feedback')
             """
             
             result = self.execute_query(stats_query, fetch=True, fetch_one=True)
@@ -472,9 +840,138 @@ class DatabaseManager:
             logger.error(f"Database health check failed: {e}")
             return False
     
+    def enqueue_log(self,
+                    table: str,
+                    columns: Tuple[str, ...],
+                    row: tuple,
+                    template: Optional[str] = None):
+        """
+        Queue a row for a batched insert into a logging table
+        
+        For analytics writes (feedback, search_queries) that don't need to
+        be durable per call. A background thread inserts queued rows with one
+        execute_values per table every _LOG_FLUSH_INTERVAL seconds, or sooner
+        once a queue reaches _LOG_FLUSH_ROWS rows.
+        
+        Args:
+            table: Target table name
+            columns: Column names, in the order of the row values
+            row: Row values
+            template: Optional execute_values row template, e.g. with subqueries
+        """
+        key = (table, tuple(columns), template)
+        
+        queue = self._log_queues.get(key)
+        if queue is None:
+            with self._log_lock:
+                queue = self._log_queues.setdefault(key, deque())
+        
+        queue.append(row)
+        
+        if len(queue) >= _LOG_FLUSH_ROWS:
+            self._log_wakeup.set()
+    
+    def flush_logs(self):
+        """
+        Insert all queued log rows, one execute_values per table
+        
+        If the database is unreachable the rows go back on their queue for
+        the next flush. If the batch is rejected for any other reason, the
+        rows are retried one at a time so only the bad rows are dropped.
+        """
+        with self._log_lock:
+            queues = list(self._log_queues.items())
+        
+        for (table, columns, template), queue in queues:
+            rows = []
+            while queue:
+                rows.append(queue.popleft())
+            
+            if not rows:
+                continue
+            
+            query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+                sql.Identifier(table), sql.SQL(',').join(map(sql.Identifier, columns))
+            )
+            
+            try:
+                with self.get_connection() as conn:
+                    with conn.cursor() as cursor:
+                        execute_values(cursor, query, rows,
+                                       template=template, page_size=len(rows))
+                    conn.commit()
+                    
+            except (OperationalError, InterfaceError) as e:
+                self._requeue_log_rows(table, queue, rows, e)
+                
+            except Exception as e:
+                logger.warning(f"Batch insert into {table} failed, retrying rows one at a time: {e}")
+                self._insert_log_rows_individually(table, queue, query, rows, template)
+    
+    def _requeue_log_rows(self, table: str, queue: deque, rows: list, error: Exception):
+        """Put rows that couldn't be written back at the front of their queue"""
+        queue.extendleft(reversed(rows))
+        
+        overflow = len(queue) - _LOG_MAX_QUEUED_ROWS
+        if overflow > 0:
+            for _ in range(overflow):
+                queue.popleft()
+            logger.error(f"Dropped {overflow} oldest queued rows for {table}: {error}")
+        else:
+            logger.warning(f"Database unavailable, keeping {len(rows)} queued rows for {table}: {error}")
+    
+    def _insert_log_rows_individually(self, table: str, queue: deque, query: sql.Composable,
+                                      rows: list, template: Optional[str]):
+        """
+        Insert rows one per savepoint, logging and skipping the ones that fail
+        
+        If the connection is lost on the way, nothing was committed: every
+        row that wasn't itself rejected goes back on the queue.
+        """
+        inserted = []
+        position = 0
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    for position, row in enumerate(rows):
+                        cursor.execute("SAVEPOINT log_row")
+                        try:
+                            execute_values(cursor, query, [row], template=template)
+                        except Exception as e:
+                            if conn.closed:
+                                raise
+                            cursor.execute("ROLLBACK TO SAVEPOINT log_row")
+                            logger.error(f"Dropped queued row for {table}: {e}")
+                        else:
+                            cursor.execute("RELEASE SAVEPOINT log_row")
+                            inserted.append(row)
+                    position = len(rows)
+                conn.commit()
+                
+        except (OperationalError, InterfaceError) as e:
+            self._requeue_log_rows(table, queue, inserted + rows[position:], e)
+            
+        except Exception as e:
+            logger.error(f"Dropped {len(inserted) + len(rows) - position} queued rows for {table}: {e}")
+    
+    def _run_log_flusher(self):
+        """Background loop behind enqueue_log, runs until close_pool stops it"""
+        while not self._log_stop.is_set():
+            self._log_wakeup.wait(_LOG_FLUSH_INTERVAL)
+            self._log_wakeup.clear()
+            
+            if not self._log_stop.is_set():
+                self.flush_logs()
+    
     def close_pool(self):
-        """Close all connections in the pool"""
+        """Stop the log flusher, flush what's left and close all connections in the pool"""
         if self.pool:
+            self._log_stop.set()
+            self._log_wakeup.set()
+            if self._log_flusher is not threading.current_thread():
+                self._log_flusher.join()
+            
+            self.flush_logs()
             self.pool.closeall()
             self.pool = None
             logger.info("Database connection pool closed")
@@ -483,6 +980,9 @@ class DatabaseManager:
 # Global database manager instance
 _db_manager: Optional[DatabaseManager] = None
 
+# Set once init_database has succeeded in this process
+_initialized = False
+
 def get_db_manager() -> DatabaseManager:
     """
     Get or create the global database manager instance
@@ -502,31 +1002,42 @@ def init_database() -> bool:
     """
     Initialize database for the application
     
+    Only does work on the first successful call per process.
+    
     Returns:
         True if successful, False otherwise
     """
+    global _initialized
+    if _initialized:
+        return True
+    
     try:
         db = get_db_manager()
         
-        # Perform health check
-        if not db.health_check():
-            logger.error("Database health check failed")
-            return False
-        
-        # Check if tables exist
-        tables_exist, missing_tables = db.check_tables_exist()
-        
-        if not tables_exist:
-            logger.info(f"Missing tables: {missing_tables}")
-            logger.info("Setting up database schema...")
-            db.setup_database()
+        # Health check, table check and any schema setup share one connection
+        with db.transaction() as (conn, cursor):
+            # Health check and table check in a single roundtrip
+            cursor.execute(_STATUS_SQL, (list(REQUIRED_TABLES),))
+            missing_tables = _missing_tables(cursor.fetchone())
             
-            # Verify setup
-            tables_exist, missing_tables = db.check_tables_exist()
-            if not tables_exist:
-                logger.error(f"Schema setup failed, still missing: {missing_tables}")
-                return False
+            if missing_tables:
+                logger.info(f"Missing tables: {missing_tables}")
+                logger.info("Setting up database schema...")
+                db._setup_schema(cursor)
+                
+                # Verify setup
+                cursor.execute(_STATUS_SQL, (list(REQUIRED_TABLES),))
+                missing_tables = _missing_tables(cursor.fetchone())
+                if missing_tables:
+                    logger.error(f"Schema setup failed, still missing: {missing_tables}")
+                    conn.rollback()
+                    return False
+            else:
+                # Indexes added after a deployment's tables were created;
+                # IF NOT EXISTS makes this a no-op once they are in place
+                db._create_indexes(cursor)
         
+        _initialized = True
         logger.info("Database initialization successful")
         return True
         
@@ -554,7 +1065,8 @@ def get_database() -> DatabaseManager:
 # Cleanup function for graceful shutdown
 def cleanup_database():
     """Clean up database connections on application shutdown"""
-    global _db_manager
+    global _db_manager, _initialized
+    _initialized = False
     if _db_manager:
         _db_manager.close_pool()
         _db_manager = None
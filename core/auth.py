@@ -4,24 +4,119 @@ Authentication core logic for HalalBot application
 Handles user authentication, registration, and session management
 """
 
+import threading
 from typing import Tuple, Optional
-from utils.file_operations import load_json, save_json
+from config.database import get_db_manager
+from utils.file_operations import load_json
 from utils.hashing import hash_password, verify_password
 from .invite_codes import validate_invite_code, use_invite_code
 
 
-# File paths
+# Legacy user store, imported into the users table on first use
 USERS_FILE = "users.json"
 
+# Insert the user and claim the invite code in one roundtrip; the claim only
+# happens if the user row was created and the code isn't already used
+_REGISTER_USER_SQL = """
+WITH ins_user AS (
+    INSERT INTO users (email, password_hash, invite_code, is_admin)
+    VALUES (%s, %s, %s, false)
+    ON CONFLICT DO NOTHING
+    RETURNING id
+), claim AS (
+    INSERT INTO invite_codes (code, used, used_by_email, used_at)
+    SELECT %s, true, %s, CURRENT_TIMESTAMP FROM ins_user
+    ON CONFLICT (code) DO UPDATE
+        SET used = true, used_by_email = EXCLUDED.used_by_email, used_at = EXCLUDED.used_at
+        WHERE invite_codes.used = false
+    RETURNING code
+)
+SELECT EXISTS (SELECT 1 FROM ins_user), EXISTS (SELECT 1 FROM claim)
+"""
+
+_import_lock = threading.Lock()
+_users_imported = False
+
+
+def normalize_email(email: str) -> str:
+    """
+    Canonical form of an email address for storage and lookups
+    
+    Emails are stored stripped and lower-cased, and every query matches on
+    lower(email) (backed by a unique index), so addresses differing only in
+    case always refer to the same account.
+    """
+    return (email or "").strip().lower()
+
 
-def load_users() -> dict:
-    """Load users from JSON file"""
-    return load_json(USERS_FILE)
+def import_users_from_json() -> int:
+    """
+    Copy users from the legacy users.json file into the users table
+    
+    Existing emails (compared case-insensitively) are left untouched, so
+    this is safe to run repeatedly.
+    
+    Returns:
+        Number of users inserted
+    """
+    users = load_json(USERS_FILE)
+    if not users:
+        return 0
+    
+    return get_db_manager().execute_many(
+        """
+        INSERT INTO users (email, password_hash, invite_code, is_admin)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT DO NOTHING
+        """,
+        [
+            (normalize_email(email), data.get("password", ""),
+             data.get("invite_code"), data.get("is_admin", False))
+            for email, data in users.items()
+        ]
+    )
+
+
+def _get_db():
+    """Get the database manager, importing legacy JSON users once per process"""
+    global _users_imported
+    
+    db = get_db_manager()
+    
+    if not _users_imported:
+        with _import_lock:
+            if not _users_imported:
+                try:
+                    import_users_from_json()
+                    _users_imported = True
+                except Exception as e:
+                    print(f"Error importing users from {USERS_FILE}: {e}")
+    
+    return db
 
 
-def save_users(users: dict) -> bool:
-    """Save users to JSON file"""
-    return save_json(USERS_FILE, users)
+def _lookup_user(email: str) -> Optional[dict]:
+    """
+    Fetch the login row (password_hash, is_admin) for an email
+    
+    Returns None unless exactly one account matches, so legacy case-variant
+    duplicates (created before the unique lower(email) index) can't be
+    confused with each other.
+    """
+    try:
+        rows = _get_db().execute_prepared(
+            "halalbot_auth_select", (normalize_email(email),), fetch_one=False
+        )
+    except Exception as e:
+        print(f"Error looking up user: {e}")
+        return None
+    
+    if len(rows) != 1:
+        if rows:
+            print(f"Refusing ambiguous login: {len(rows)} accounts match this email")
+        return None
+    
+    return rows[0]
 
 
 def authenticate_user(email: str, password: str) -> bool:
@@ -35,19 +130,22 @@ def authenticate_user(email: str, password: str) -> bool:
     Returns:
         True if authentication successful, False otherwise
     """
-    users = load_users()
+    user = _lookup_user(email)
     
-    if email not in users:
+    if not user:
         return False
     
-    stored_hash = users[email].get("password", "")
-    return verify_password(password, stored_hash)
+    return verify_password(password, user["password_hash"])
 
 
 def register_user(email: str, password: str, invite_code: str) -> Tuple[bool, Optional[str]]:
     """
     Register a new user
     
+    The user insert and the invite code claim run as one statement in one
+    transaction, so a code can't be claimed twice by concurrent sign-ups
+    and a user is never created without claiming it.
+    
     Args:
         email: User's email address
         password: Plain text password
@@ -56,31 +154,39 @@ def register_user(email: str, password: str, invite_code: str) -> Tuple[bool, Op
     Returns:
         Tuple of (success: bool, error_message: Optional[str])
     """
-    users = load_users()
-    
-    # Check if user already exists
-    if email in users:
-        return False, "User already exists."
+    email = normalize_email(email)
     
     # Validate invite code
     if not validate_invite_code(invite_code):
         return False, "Invalid or used invite code."
     
-    # Create new user
-    users[email] = {
-        "password": hash_password(password),
-        "invite_code": invite_code,
-        "is_admin": False,
-        "created_at": None,  # Can be set to current timestamp if needed
-        "last_login": None
-    }
-    
-    # Save users and mark invite code as used
-    if save_users(users):
-        use_invite_code(invite_code, email)
-        return True, None
-    else:
+    try:
+        with _get_db().get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(_REGISTER_USER_SQL, (
+                    email, hash_password(password), invite_code,
+                    invite_code, email
+                ))
+                user_created, code_claimed = cursor.fetchone()
+                
+                # Check if user already exists
+                if not user_created:
+                    conn.rollback()
+                    return False, "User already exists."
+                
+                if not code_claimed:
+                    conn.rollback()
+                    return False, "Invalid or used invite code."
+                
+                conn.commit()
+        
+    except Exception as e:
+        print(f"Error registering user: {e}")
         return False, "Failed to save user data."
+    
+    # Mirror the claim into the invite code file used by the admin tools
+    use_invite_code(invite_code, email)
+    return True, None
 
 
 def is_admin(email: str) -> bool:
@@ -93,8 +199,8 @@ def is_admin(email: str) -> bool:
     Returns:
         True if user is admin, False otherwise
     """
-    users = load_users()
-    return users.get(email, {}).get("is_admin", False)
+    user = _lookup_user(email)
+    return bool(user and user["is_admin"])
 
 
 def get_user_info(email: str) -> Optional[dict]:
@@ -105,18 +211,44 @@ def get_user_info(email: str) -> Optional[dict]:
         email: User's email address
         
     Returns:
-        User info dictionary or None if user doesn't exist
+        User info dictionary (without password) or None if user doesn't exist
     """
-    users = load_users()
-    user_data = users.get(email)
+    try:
+        user = _get_db().execute_query(
+            """
+            SELECT invite_code, is_admin, created_at, last_login
+            FROM users WHERE lower(email) = %s
+            """,
+            (normalize_email(email),),
+            fetch_one=True
+        )
+    except Exception as e:
+        print(f"Error getting user info: {e}")
+        return None
     
-    if user_data:
-        # Return copy without password for security
-        safe_data = user_data.copy()
-        safe_data.pop("password", None)
-        return safe_data
+    return dict(user) if user else None
+
+
+def list_users() -> dict:
+    """
+    Get all users for the admin dashboard
     
-    return None
+    Returns:
+        Dictionary mapping email to user info (without password)
+    """
+    try:
+        rows = _get_db().execute_query(
+            """
+            SELECT email, invite_code, is_admin, created_at, last_login
+            FROM users ORDER BY created_at, id
+            """,
+            fetch=True
+        )
+    except Exception as e:
+        print(f"Error listing users: {e}")
+        return {}
+    
+    return {row.pop("email"): dict(row) for row in rows}
 
 
 def update_user_admin_status(email: str, is_admin_status: bool) -> bool:
@@ -130,13 +262,14 @@ def update_user_admin_status(email: str, is_admin_status: bool) -> bool:
     Returns:
         True if updated successfully, False otherwise
     """
-    users = load_users()
-    
-    if email not in users:
+    try:
+        return _get_db().execute_query(
+            "UPDATE users SET is_admin = %s WHERE lower(email) = %s",
+            (is_admin_status, normalize_email(email))
+        ) > 0
+    except Exception as e:
+        print(f"Error updating admin status: {e}")
         return False
-    
-    users[email]["is_admin"] = is_admin_status
-    return save_users(users)
 
 
 def change_user_password(email: str, old_password: str, new_password: str) -> Tuple[bool, Optional[str]]:
@@ -155,12 +288,14 @@ def change_user_password(email: str, old_password: str, new_password: str) -> Tu
     if not authenticate_user(email, old_password):
         return False, "Current password is incorrect."
     
-    users = load_users()
-    users[email]["password"] = hash_password(new_password)
-    
-    if save_users(users):
+    try:
+        _get_db().execute_query(
+            "UPDATE users SET password_hash = %s WHERE lower(email) = %s",
+            (hash_password(new_password), normalize_email(email))
+        )
         return True, None
-    else:
+    except Exception as e:
+        print(f"Error changing password: {e}")
         return False, "Failed to save new password."
 
 
@@ -171,8 +306,12 @@ def get_user_count() -> int:
     Returns:
         Number of registered users
     """
-    users = load_users()
-    return len(users)
+    try:
+        result = _get_db().execute_query("SELECT COUNT(*) AS count FROM users", fetch_one=True)
+        return result["count"]
+    except Exception as e:
+        print(f"Error counting users: {e}")
+        return 0
 
 
 def get_admin_count() -> int:
@@ -182,5 +321,11 @@ def get_admin_count() -> int:
     Returns:
         Number of admin users
     """
-    users = load_users()
-    return sum(1 for user in users.values() if user.get("is_admin", False))
\ No newline at end of file
+    try:
+        result = _get_db().execute_query(
+            "SELECT COUNT(*) AS count FROM users WHERE is_admin", fetch_one=True
+        )
+        return result["count"]
+    except Exception as e:
+        print(f"Error counting admin users: {e}")
+        return 0
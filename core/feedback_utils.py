@@ -36,6 +36,13 @@ PENALTY_PER_DOWNVOTE = 0.02
 MAX_PENALTY = 0.3
 BACKUP_ENABLED = True
 
+# Row template for batched feedback inserts: (email, text hash, query, type, timestamp)
+_FEEDBACK_ROW_TEMPLATE = """(
+    (SELECT id FROM users WHERE lower(email) = lower(%s)),
+    (SELECT id FROM documents WHERE encode(sha256(text::bytea), 'hex') = %s LIMIT 1),
+    %s, %s, %s
+)"""
+
 # --- CORE UTILITIES ---
 
 def hash_text(text: str) -> str:
@@ -72,7 +79,7 @@ def get_user_id(email: str) -> Optional[int]:
     try:
         db = get_db_manager()
         result = db.execute_query(
-            "SELECT id FROM users WHERE email = %s", 
+            "SELECT id FROM users WHERE lower(email) = lower(%s)", 
             (email,), 
             fetch=True
         )
@@ -133,15 +140,17 @@ def log_feedback_to_database(user_email: str, document_text: str, query: str,
     
     try:
         db = get_db_manager()
-        user_id = get_user_id(user_email)
         text_hash = hash_text(document_text)
-        document_id = get_document_id(text_hash)
         
-        # Insert feedback record
-        db.execute_query("""
-            INSERT INTO feedback (user_id, document_id, query, feedback_type, timestamp)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (user_id, document_id, query, feedback_type, datetime.now()))
+        # Queue the feedback record for the next batched insert; user and
+        # document ids are resolved in the insert itself (same lookups as
+        # get_user_id/get_document_id)
+        db.enqueue_log(
+            "feedback",
+            ("user_id", "document_id", "query", "feedback_type", "timestamp"),
+            (user_email, text_hash, query, feedback_type, datetime.now()),
+            template=_FEEDBACK_ROW_TEMPLATE
+        )
         
         return True
         
@@ -4,7 +4,9 @@ Query blocking and filtering system for HalalBot application
 Handles inappropriate query detection and content filtering
 """
 
-from typing import List, Set
+import re
+from functools import lru_cache
+from typing import List, Optional, Pattern, Set, Tuple
 from utils.file_operations import load_text_file_lines, append_jsonl
 from utils.logging import log_blocked_query
 
@@ -38,8 +40,27 @@ def is_blocked_query(query: str, blocked_phrases: List[str] = None) -> bool:
     if blocked_phrases is None:
         blocked_phrases = load_blocked_phrases()
     
-    query_lower = query.lower()
-    return any(phrase in query_lower for phrase in blocked_phrases)
+    pattern = _compile_blocked_pattern(tuple(blocked_phrases))
+    if pattern is None:
+        return False
+    
+    return pattern.search(query.lower()) is not None
+
+
+@lru_cache(maxsize=8)
+def _compile_blocked_pattern(blocked_phrases: Tuple[str, ...]) -> Optional[Pattern[str]]:
+    """
+    Compile blocked phrases into a single alternation regex
+    
+    Args:
+        blocked_phrases: Tuple of lowercase blocked phrases
+        
+    Returns:
+        Compiled pattern matching any phrase as a substring, or None if empty
+    """
+    if not blocked_phrases:
+        return None
+    return re.compile("|".join(re.escape(phrase) for phrase in blocked_phrases))
 
 
 def add_blocked_phrase(phrase: str) -> bool:
@@ -16,8 +16,12 @@ cosine similarity calculations for Islamic knowledge documents.
 
 import numpy as np
 import json
+import os
 import sys
-from typing import List, Dict, Optional, Tuple
+import threading
+import time
+from itertools import groupby
+from typing import List, Dict, Iterable, Optional, Tuple
 from pathlib import Path
 
 # Import dependencies
@@ -31,6 +35,7 @@ except ImportError:
 sys.path.append(str(Path(__file__).parent.parent))
 
 try:
+    from psycopg2.extras import RealDictCursor
     from config.database import get_db_manager
     from utils.text_processing import clean_text
 except ImportError as e:
@@ -38,6 +43,301 @@ except ImportError as e:
     print("Make sure you have the required modules in config/ and utils/")
 
 
+def _cgroup_cpu_limit() -> Optional[int]:
+    """
+    Get the container's CPU quota from cgroups, rounded up to whole CPUs
+    
+    Reads cgroup v2 cpu.max, falling back to the v1 CFS files.
+    
+    Returns:
+        CPU limit, or None if there is no quota
+    """
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                quota = f.read().strip()
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = f.read().strip()
+        except OSError:
+            return None
+    
+    try:
+        quota, period = int(quota), int(period)
+    except ValueError:  # "max": no quota
+        return None
+    
+    if quota <= 0 or period <= 0:
+        return None
+    return max(1, -(-quota // period))
+
+
+def get_available_cpus() -> int:
+    """
+    Get the number of CPUs this process can actually use
+    
+    The scheduler affinity mask only reflects cpusets; containers limited by
+    a CPU quota (as on Railway) still see every host core there, so the
+    cgroup quota is applied on top.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    
+    limit = _cgroup_cpu_limit()
+    return min(cpus, limit) if limit else cpus
+
+
+def configure_torch_threads():
+    """
+    Size torch's intra-op thread pool for query encoding
+    
+    Uses HALALBOT_TORCH_THREADS if set, otherwise get_available_cpus().
+    """
+    try:
+        import torch
+    except ImportError:
+        return
+    
+    threads = os.getenv("HALALBOT_TORCH_THREADS")
+    try:
+        threads = int(threads) if threads else get_available_cpus()
+    except ValueError:
+        print(f"⚠️  Ignoring invalid HALALBOT_TORCH_THREADS={threads!r}")
+        threads = get_available_cpus()
+    
+    torch.set_num_threads(max(1, threads))
+
+
+# Source filter values used by the UI, mapped to document categories
+SOURCE_FILTER_CATEGORIES = {
+    "quran-only": "quran",
+    "hadith-only": "hadith",
+    "fatwa-only": "fatwa",
+    "zakat-only": "zakat",
+    "other-only": "other"
+}
+
+# Ranking priority of each category (lower is higher priority)
+CATEGORY_PRIORITIES = {
+    "quran": 0,    # Highest priority - Direct word of Allah
+    "hadith": 1,   # Second - Prophetic traditions
+    "fatwa": 2,    # Third - Scholarly rulings
+    "zakat": 3,    # Fourth - Specific zakat guidance
+    "other": 4     # Lowest - General Islamic content
+}
+UNKNOWN_CATEGORY_PRIORITY = 5
+
+
+class DocumentIndex:
+    """
+    In-memory snapshot of the searchable document collection
+    
+    Documents are sorted by category at load time so that every source
+    filter maps to a contiguous slice of the embedding matrix. Filtering
+    happens before any similarity is computed and without copying rows.
+    """
+    
+    def __init__(self, documents: Iterable[Dict]):
+        """
+        Build the index from database rows
+        
+        Rows are consumed one at a time and their embedding_json is moved
+        into the float32 matrix, so the stored rows only keep the fields
+        search results are built from.
+        
+        Args:
+            documents: Rows with id, text, category and embedding_json
+        """
+        valid_docs = []
+        vectors = []
+        for doc in documents:
+            embedding = doc.pop('embedding_json')
+            if isinstance(embedding, list) and len(embedding) == 384:
+                valid_docs.append(doc)
+                vectors.append(np.asarray(embedding, dtype=np.float32))
+        
+        category_of = lambda doc: doc['category'] or 'other'
+        order = sorted(range(len(valid_docs)), key=lambda i: category_of(valid_docs[i]))
+        
+        self.documents = [valid_docs[i] for i in order]
+        embeddings = np.empty((len(order), 384), dtype=np.float32)
+        for row, i in enumerate(order):
+            embeddings[row] = vectors[i]
+        del valid_docs, vectors
+        
+        # Store unit-length rows so scoring is a single dot product per query
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        self.embeddings = np.divide(
+            embeddings, norms, out=embeddings, where=norms != 0
+        )
+        
+        # Contiguous row range for each category
+        self.category_slices: Dict[str, slice] = {}
+        start = 0
+        for category, group in groupby(self.documents, key=category_of):
+            count = sum(1 for _ in group)
+            self.category_slices[category] = slice(start, start + count)
+            start += count
+        
+        # Category priority of every row, for ranking without Python loops
+        self.priorities = np.empty(len(self.documents), dtype=np.int8)
+        for category, rows in self.category_slices.items():
+            self.priorities[rows] = CATEGORY_PRIORITIES.get(category, UNKNOWN_CATEGORY_PRIORITY)
+    
+    def __len__(self) -> int:
+        return len(self.documents)
+    
+    def select(self, source_filter: Optional[str] = None) -> slice:
+        """
+        Get the row range matching a source filter
+        
+        Args:
+            source_filter: Category filter (quran-only, hadith-only, etc.)
+            
+        Returns:
+            Slice of rows to search (all rows if no valid filter)
+        """
+        category = SOURCE_FILTER_CATEGORIES.get(source_filter)
+        if category is None:
+            return slice(0, len(self.documents))
+        return self.category_slices.get(category, slice(0, 0))
+    
+    def score(self, query_embeddings, rows: slice) -> np.ndarray:
+        """
+        Calculate cosine similarity against a range of indexed documents
+        
+        Args:
+            query_embeddings: Query embedding, or a matrix with one query per row
+            rows: Row range from select()
+            
+        Returns:
+            Raw cosine similarity scores (-1 to 1): one per document for a
+            single query, or a (queries x documents) matrix for several
+        """
+        q = np.asarray(query_embeddings, dtype=np.float32)
+        q_norms = np.linalg.norm(q, axis=-1, keepdims=True)
+        q = np.divide(q, q_norms, out=np.zeros_like(q), where=q_norms != 0)
+        return q @ self.embeddings[rows].T
+
+
+# Global document index instance, reloaded when the documents table changes
+_document_index: Optional[DocumentIndex] = None
+_index_lock = threading.Lock()
+_index_state = {
+    'generation': 0,      # bumped on every (re)load
+    'signature': None,    # (row count, latest updated_at) at load time
+    'local_writes': None, # DatabaseManager.table_write_count('documents') at load time
+    'checked_at': 0.0     # time.monotonic() of the last staleness check
+}
+
+# How often (seconds) to check the table for changes made by other processes
+INDEX_CHECK_INTERVAL = 60.0
+
+# Rows per roundtrip when loading the index
+INDEX_FETCH_ROWS = 2000
+
+_INDEX_SIGNATURE_SQL = "SELECT COUNT(*) AS count, MAX(updated_at) AS latest FROM documents"
+
+
+def _index_signature(db) -> tuple:
+    """Cheap fingerprint of the documents table"""
+    row = db.execute_query(_INDEX_SIGNATURE_SQL, fetch_one=True)
+    return row['count'], row['latest']
+
+
+def _index_is_fresh(db) -> bool:
+    """Whether the loaded index can be used without checking the table"""
+    return (
+        _document_index is not None
+        and _index_state['local_writes'] == db.table_write_count('documents')
+        and time.monotonic() - _index_state['checked_at'] < INDEX_CHECK_INTERVAL
+    )
+
+
+def _load_document_index(db) -> DocumentIndex:
+    """
+    Build a DocumentIndex from a server-side cursor
+    
+    Rows are fetched INDEX_FETCH_ROWS at a time, so the full result set
+    (with every embedding as a list of Python floats) is never in memory.
+    """
+    sql_query, params = DatabaseSearchService.build_search_query(None)
+    
+    with db.get_connection() as conn:
+        with conn.cursor(name='halalbot_document_index', cursor_factory=RealDictCursor) as cursor:
+            cursor.itersize = INDEX_FETCH_ROWS
+            cursor.execute(sql_query, params)
+            index = DocumentIndex(cursor)
+        conn.rollback()
+    
+    return index
+
+
+def get_document_index(db=None) -> DocumentIndex:
+    """
+    Get or load the global document index
+    
+    The snapshot is reloaded right away after documents are bulk loaded in
+    this process, and otherwise when the table's row count or latest
+    updated_at changes (checked at most every INDEX_CHECK_INTERVAL seconds).
+    If that check or the reload fails, the loaded snapshot keeps serving.
+    
+    Args:
+        db: Database manager to load from (defaults to the global one)
+        
+    Returns:
+        DocumentIndex instance
+    """
+    global _document_index
+    
+    db = db or get_db_manager()
+    
+    if _index_is_fresh(db):
+        return _document_index
+    
+    # One thread checks/loads; concurrent first searches wait for its snapshot
+    with _index_lock:
+        if _index_is_fresh(db):
+            return _document_index
+        
+        local_writes = db.table_write_count('documents')
+        try:
+            signature = _index_signature(db)
+            
+            if (
+                _document_index is None
+                or signature != _index_state['signature']
+                or local_writes != _index_state['local_writes']
+            ):
+                _document_index = _load_document_index(db)
+                _index_state['generation'] += 1
+                _index_state['signature'] = signature
+                _index_state['local_writes'] = local_writes
+                
+        except Exception as e:
+            # Keep serving the loaded snapshot; it is checked again next time
+            if _document_index is None:
+                raise
+            print(f"⚠️  Could not refresh the document index, using the loaded one: {e}")
+        
+        _index_state['checked_at'] = time.monotonic()
+        return _document_index
+
+
+def document_index_generation(db=None) -> int:
+    """
+    Get the current document index generation, reloading it first if stale
+    
+    Results computed against one generation are stale once this changes.
+    """
+    get_document_index(db)
+    return _index_state['generation']
+
+
 class DatabaseSearchService:
     """
     FIXED PostgreSQL-based semantic search service for Islamic documents
@@ -57,6 +357,9 @@ class DatabaseSearchService:
         self.debug_mode = debug_mode
         
         try:
+            # Let single-query encoding use the CPUs available to the container
+            configure_torch_threads()
+            
             # Load the sentence transformer model
             if self.debug_mode:
                 print("🤖 Loading sentence transformer model...")
@@ -138,7 +441,8 @@ class DatabaseSearchService:
                 print(f"⚠️  Error calculating normalized cosine similarity: {e}")
             return 0.0
     
-    def build_search_query(self, source_filter: Optional[str] = None) -> Tuple[str, Dict]:
+    @staticmethod
+    def build_search_query(source_filter: Optional[str] = None) -> Tuple[str, Dict]:
         """
         FIXED: Build optimized SQL query for document retrieval (NO LIMITS)
         
@@ -162,18 +466,9 @@ class DatabaseSearchService:
         params = {}
         
         # Add category filtering
-        if source_filter:
-            filter_mapping = {
-                "quran-only": "quran",
-                "hadith-only": "hadith",
-                "fatwa-only": "fatwa",
-                "zakat-only": "zakat",
-                "other-only": "other"
-            }
-            
-            if source_filter in filter_mapping:
-                base_query += " AND category = %(category)s"
-                params['category'] = filter_mapping[source_filter]
+        if source_filter in SOURCE_FILTER_CATEGORIES:
+            base_query += " AND category = %(category)s"
+            params['category'] = SOURCE_FILTER_CATEGORIES[source_filter]
         
         # REMOVED: No more arbitrary LIMIT 2000
         # Now searches ALL valid documents for best results
@@ -190,14 +485,92 @@ class DatabaseSearchService:
         Returns:
             Priority value (lower is higher priority)
         """
-        priority_map = {
-            "quran": 0,    # Highest priority - Direct word of Allah
-            "hadith": 1,   # Second - Prophetic traditions
-            "fatwa": 2,    # Third - Scholarly rulings
-            "zakat": 3,    # Fourth - Specific zakat guidance
-            "other": 4     # Lowest - General Islamic content
-        }
-        return priority_map.get(category, 5)
+        return CATEGORY_PRIORITIES.get(category, UNKNOWN_CATEGORY_PRIORITY)
+    
+    def rank_results(
+        self,
+        candidates: List[Dict],
+        similarities: np.ndarray,
+        top_k: int,
+        min_score: float,
+        priorities: Optional[np.ndarray] = None
+    ) -> List[Dict]:
+        """
+        Turn scored candidate documents into ranked search results
+        
+        Candidates are thresholded and ordered in NumPy; text is only cleaned
+        for rows in ranked order until top_k of them pass the length check.
+        
+        Args:
+            candidates: Candidate document rows
+            similarities: Similarity score for each candidate
+            top_k: Maximum number of results to return
+            min_score: Minimum similarity score threshold
+            priorities: Category priority of each candidate (DocumentIndex.priorities)
+        
+        Returns:
+            Top results ordered by category priority, then score
+        """
+        # Apply minimum score threshold before building any result objects
+        above_threshold = np.flatnonzero(similarities >= min_score)
+        
+        if priorities is None:
+            priorities = np.fromiter(
+                (self.calculate_category_priority(candidates[idx]['category'] or 'other')
+                 for idx in above_threshold),
+                dtype=np.int8, count=len(above_threshold)
+            )
+        else:
+            priorities = priorities[above_threshold]
+        
+        # Category priority first, then score (descending)
+        ranked = above_threshold[np.lexsort((-similarities[above_threshold], priorities))]
+        
+        scored_results = []
+        processing_errors = 0
+        
+        for idx in ranked:
+            doc = candidates[idx]
+            similarity = float(similarities[idx])
+            
+            try:
+                # Clean and format text
+                cleaned_text = clean_text(doc['text']) if doc['text'] else ''
+                if len(cleaned_text.strip()) < 20:  # Skip very short texts
+                    continue
+                
+                # Create result object
+                result = {
+                    'id': doc['id'],
+                    'doc_id': doc['doc_id'],
+                    'text': cleaned_text,
+                    'source': doc['source'] or 'unknown',
+                    'category': doc['category'] or 'other',
+                    'title': doc['title'],
+                    'score': similarity,
+                    'base_score': similarity,
+                    'metadata': doc['metadata'] or {}
+                }
+                
+                scored_results.append(result)
+                if len(scored_results) == top_k:
+                    break
+            
+            except Exception as e:
+                processing_errors += 1
+                if self.debug_mode and processing_errors <= 3:
+                    print(f"⚠️  Error processing document {doc.get('id', 'unknown')}: {e}")
+                continue
+        
+        # Debug: Print similarity statistics
+        if self.debug_mode:
+            print(f"📊 Similarity statistics:")
+            print(f"   • Documents processed: {len(similarities)}")
+            print(f"   • Similarity range: {similarities.min():.6f} to {similarities.max():.6f}")
+            print(f"   • Average similarity: {similarities.mean():.6f}")
+            print(f"   • Results above threshold: {len(above_threshold)}")
+        
+        return scored_results
     
     def search(
         self,
@@ -224,86 +597,27 @@ class DatabaseSearchService:
                 print(f"🔍 Searching for: '{query}' with min_score={min_score}")
             query_embedding = self.model.encode([query])[0].tolist()
             
-            # Build and execute database query (now gets ALL valid documents)
-            sql_query, params = self.build_search_query(source_filter)
-            documents = self.db.execute_query(sql_query, params, fetch=True)
+            # Pre-filter by source, then score the selected rows in one pass
+            index = get_document_index(self.db)
+            rows = index.select(source_filter)
+            candidates = index.documents[rows]
             
             if self.debug_mode:
-                print(f"📚 Retrieved {len(documents)} documents from database")
-            
-            # Calculate similarities and filter results
-            scored_results = []
-            similarities_calculated = 0
-            processing_errors = 0
-            similarity_stats = []
-            
-            for doc in documents:
-                try:
-                    # Get document embedding (already a list from JSONB)
-                    doc_embedding = doc['embedding_json']
-                    
-                    # Quick validation (we know from debug all should be valid)
-                    if not isinstance(doc_embedding, list) or len(doc_embedding) != 384:
-                        continue
-                    
-                    # Calculate similarity
-                    similarity = self.cosine_similarity(query_embedding, doc_embedding)
-                    similarities_calculated += 1
-                    similarity_stats.append(similarity)
-                    
-                    # Debug: Show first few results
-                    if self.debug_mode and similarities_calculated <= 5:
-                        text_preview = doc['text'][:80] if doc['text'] else 'No text'
-                        print(f"  📄 Doc {doc['id']}: similarity={similarity:.6f} | {text_preview}...")
-                    
-                    # Apply minimum score threshold
-                    if similarity < min_score:
-                        continue
-                    
-                    # Clean and format text
-                    cleaned_text = clean_text(doc['text']) if doc['text'] else ''
-                    if len(cleaned_text.strip()) < 20:  # Skip very short texts
-                        continue
-                    
-                    # Create result object
-                    result = {
-                        'id': doc['id'],
-                        'doc_id': doc['doc_id'],
-                        'text': cleaned_text,
-                        'source': doc['source'] or 'unknown',
-                        'category': doc['category'] or 'other',
-                        'title': doc['title'],
-                        'score': similarity,
-                        'base_score': similarity,
-                        'metadata': doc['metadata'] or {}
-                    }
-                    
-                    scored_results.append(result)
-                    
-                except Exception as e:
-                    processing_errors += 1
-                    if self.debug_mode and processing_errors <= 3:
-                        print(f"⚠️  Error processing document {doc.get('id', 'unknown')}: {e}")
-                    continue
+                print(f"📚 Searching {len(candidates)} of {len(index)} indexed documents")
             
-            # Debug: Print similarity statistics
-            if self.debug_mode and similarity_stats:
-                print(f"📊 Similarity statistics:")
-                print(f"   • Documents processed: {similarities_calculated}")
-                print(f"   • Similarity range: {min(similarity_stats):.6f} to {max(similarity_stats):.6f}")
-                print(f"   • Average similarity: {np.mean(similarity_stats):.6f}")
-                print(f"   • Results above threshold: {len(scored_results)}")
-            
-            # Sort results by priority and score
-            scored_results.sort(
-                key=lambda x: (
-                    self.calculate_category_priority(x['category']),  # Category priority first
-                    -x['score']  # Then by score (descending)
-                )
-            )
+            if not candidates:
+                return []
+            
+            similarities = index.score(query_embedding, rows)
             
-            # Return top results
-            final_results = scored_results[:top_k]
+            if self.debug_mode:
+                for doc, similarity in zip(candidates[:5], similarities[:5]):
+                    text_preview = doc['text'][:80] if doc['text'] else 'No text'
+                    print(f"  📄 Doc {doc['id']}: similarity={similarity:.6f} | {text_preview}...")
+            
+            final_results = self.rank_results(
+                candidates, similarities, top_k, min_score, index.priorities[rows]
+            )
             
             if self.debug_mode:
                 print(f"✅ Found {len(final_results)} relevant results")
@@ -317,6 +631,58 @@ class DatabaseSearchService:
                 traceback.print_exc()
             return []
     
+    def search_batch(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        min_score: float = 0.05,
+        source_filter: Optional[str] = None
+    ) -> List[List[Dict]]:
+        """
+        Search several queries at once
+        
+        All queries are embedded in a single model forward pass and scored
+        against the documents with one matrix product.
+        
+        Args:
+            queries: Search query texts
+            top_k: Maximum number of results per query
+            min_score: Minimum similarity score threshold
+            source_filter: Optional category filter
+            
+        Returns:
+            One list of search results per query, in input order
+        """
+        if not queries:
+            return []
+        
+        try:
+            query_embeddings = self.model.encode(
+                list(queries), batch_size=len(queries), convert_to_numpy=True
+            )
+            
+            index = get_document_index(self.db)
+            rows = index.select(source_filter)
+            candidates = index.documents[rows]
+            
+            if not candidates:
+                return [[] for _ in queries]
+            
+            similarity_matrix = index.score(query_embeddings, rows)
+            priorities = index.priorities[rows]
+            
+            return [
+                self.rank_results(candidates, similarities, top_k, min_score, priorities)
+                for similarities in similarity_matrix
+            ]
+            
+        except Exception as e:
+            print(f"❌ Batch search failed: {e}")
+            if self.debug_mode:
+                import traceback
+                traceback.print_exc()
+            return [[] for _ in queries]
+    
     def search_with_stats(self, query: str, top_k: int = 5, min_score: float = 0.05,
                          source_filter: Optional[str] = None) -> Tuple[List[Dict], Dict]:
         """
@@ -385,6 +751,30 @@ class DatabaseSearchService:
             return {'total_documents': 0, 'total_with_embeddings': 0, 'categories': {}}
 
 
+# Global search service instance
+_search_service: Optional[DatabaseSearchService] = None
+_search_service_lock = threading.Lock()
+
+
+def get_search_service() -> DatabaseSearchService:
+    """
+    Get or create the global search service instance
+    Loads the sentence transformer model once per process
+    
+    Returns:
+        DatabaseSearchService instance
+    """
+    global _search_service
+    
+    if _search_service is None:
+        # The precompute thread and the first search can both get here
+        with _search_service_lock:
+            if _search_service is None:
+                _search_service = DatabaseSearchService(debug_mode=False)
+    
+    return _search_service
+
+
 # --- COMPATIBILITY FUNCTIONS ---
 # These functions maintain compatibility with the existing codebase
 
@@ -407,8 +797,7 @@ def search_faiss(
         List of search results compatible with existing code
     """
     try:
-        service = DatabaseSearchService(debug_mode=False)
-        return service.search(query, top_k, min_score, source_filter)
+        return get_search_service().search(query, top_k, min_score, source_filter)
     except Exception as e:
         print(f"❌ Search service error: {e}")
         return []
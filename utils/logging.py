@@ -5,8 +5,9 @@ Handles query history, blocked queries, and user activity logging
 """
 
 import os
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from .file_operations import append_jsonl, ensure_directory
 from .hashing import hash_email
@@ -20,6 +21,24 @@ FEEDBACK_LOG_FILE = "feedback_log.jsonl"
 # Ensure history directory exists
 ensure_directory(HISTORY_DIR)
 
+# Background writer so logging stays off the request path
+_LOG_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="halalbot-log")
+
+
+def log_in_background(log_func: Callable[..., bool], *args: Any, **kwargs: Any) -> Future:
+    """
+    Run a logging function on a background thread
+    
+    Args:
+        log_func: Logging function to call (e.g. log_query_for_user)
+        *args: Positional arguments for log_func
+        **kwargs: Keyword arguments for log_func
+        
+    Returns:
+        Future resolving to the logging function's return value
+    """
+    return _LOG_EXECUTOR.submit(log_func, *args, **kwargs)
+
 
 def log_query_for_user(email: str, query: str, results: List[Dict[str, Any]]) -> bool:
     """